@@ -1,23 +1,35 @@
-import os
 import warnings
-import pandas as pd
-import plotly.express as px
 import streamlit as st
-import numpy as np
 import base64
-import io
 import os
-import json
-from PIL import Image
-import plotly.graph_objs as go
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
+# Aset statis di-encode sekali per proses server, bukan di setiap rerun
+@st.cache_resource
 def get_base64_image(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode()
 
+# Fungsi untuk mengatur warna berdasarkan peringkat
+def set_color_rank(data):
+    colors = []
+    for i in range(len(data)):
+        if i == 0:
+            colors.append("Top 1")     # Warna Emas untuk Top 1
+        elif i == 1:
+            colors.append("Top 2")   # Warna Perak untuk Top 2
+        elif i == 2:
+            colors.append("Top 3")   # Warna Perunggu untuk Top 3
+        else:
+            colors.append("Top 4-10")  # Warna Biru Muda untuk yang lain
+    return colors
+
 # Path to your local image
 image_path = "assets/RBPab.png"
 image_base64 = get_base64_image(image_path)
@@ -51,42 +63,213 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# Debug performa (opsional): waktu, jumlah baris dan perubahan memori per tahap rerun.
+# Riwayat disimpan bergulir per sesi (maks 2000 catatan) dan bisa diunduh sebagai CSV.
+perf_debug = st.sidebar.checkbox("Mode debug performa", value=False)
+perf_history = st.session_state.setdefault('perf_history', deque(maxlen=2000))
+perf_run = st.session_state['perf_run'] = st.session_state.get('perf_run', 0) + 1
+perf_section = {}
+
+# current_rss_mb, perf_entry dan timed_download dari rehandling_core (di-import setelah ada file;
+# semua tahap yang diukur berjalan setelah upload)
+def perf_record(stage, start, rss_before, rows_in=None, rows_out=None, payload_kb=None, run=None):
+    perf_history.append(perf_entry(stage, start, rss_before, rows_in, rows_out, payload_kb, run or perf_run))
+
+# Ukur satu tahap: with perf_stage("filter tanggal", len(df)) as perf: ...; perf['rows_out'] = len(df)
+@contextmanager
+def perf_stage(stage, rows_in=None):
+    perf = {'rows_out': None}
+    if not perf_debug:
+        yield perf
+        return
+    start, rss_before = time.perf_counter(), current_rss_mb()
+    try:
+        yield perf
+    finally:
+        perf_record(stage, start, rss_before, rows_in, perf['rows_out'])
+
+# Waktu per bagian dihitung dari judul bagian ke judul berikutnya (membangun tabel + grafik)
+def close_perf_section():
+    if perf_debug and perf_section:
+        perf_record(f"bagian: {perf_section['name']}", perf_section['start'], perf_section['rss'])
+    perf_section.clear()
+
+# Unduhan dijalankan Streamlit di thread lain; catatan langsung ditambahkan ke riwayat sesi ini.
+# Dibungkus partial fungsi modul (bukan closure script) agar callable unduhan tidak menahan namespace script.
+def perf_download(stage, build):
+    if not perf_debug:
+        return build
+    return partial(timed_download, build, perf_history.append, stage, perf_run)
+
+# Snapshot HTML: judul bagian, grafik dan tabel utama dicatat sesuai urutan tampil agar bisa diekspor jadi satu file statis
+snapshot_items = []
+
+def section_header(title):
+    close_perf_section()
+    if perf_debug:
+        perf_section.update(name=title, start=time.perf_counter(), rss=current_rss_mb())
+    st.subheader(title)
+    snapshot_items.append(('judul', title))
+
+def show_chart(fig):
+    if perf_debug:
+        # Ukuran payload = JSON figure yang dikirim ke browser
+        start, rss_before = time.perf_counter(), current_rss_mb()
+        payload_kb = round(len(fig.to_json()) / 1024, 1)
+        st.plotly_chart(fig, use_container_width=True)
+        perf_record(f"grafik: {fig.layout.title.text or perf_section.get('name', '(tanpa judul)')}", start, rss_before, payload_kb=payload_kb)
+    else:
+        st.plotly_chart(fig, use_container_width=True)
+    snapshot_items.append(('grafik', fig))
+
+# Semua tabel bagian dashboard lewat sini agar ikut snapshot HTML dan panel debug performa
+# (argumen lain diteruskan ke st.dataframe, mis. on_select untuk tabel yang bisa diklik)
+def show_table(table, **kwargs):
+    if perf_debug:
+        # Ukuran payload = memori tabel yang dikirim ke browser
+        start, rss_before = time.perf_counter(), current_rss_mb()
+        payload_kb = round(table.memory_usage(deep=True).sum() / 1024, 1)
+        result = st.dataframe(table, **kwargs)
+        perf_record(f"tabel: {perf_section.get('name', '(tanpa judul)')}", start, rss_before, rows_out=len(table), payload_kb=payload_kb)
+    else:
+        result = st.dataframe(table, **kwargs)
+    snapshot_items.append(('tabel', table))
+    return result
+
 fl = st.file_uploader(":file_folder: Upload a file", type=(["csv","xlsx"]))
 if fl is not None:
-    filename = fl.name
-    st.write(filename)
-
-    # Check file extension and load accordingly
-    if filename.endswith('.csv') or filename.endswith('.txt'):
-        df = pd.read_csv(fl, encoding="ISO-8859-1")
-    elif filename.endswith('.xlsx') or filename.endswith('.xls'):
-        # Membaca semua sheet dan menggabungkannya
-        df = pd.concat(pd.read_excel(fl, sheet_name=None), ignore_index=True)
-    else:
-        st.error("Unsupported file type. Please upload a CSV or Excel file.")
-        st.stop()  # Stop execution if the file type is not supported
+    # Modul berat (pandas, numpy, plotly, rehandling_core) baru di-import setelah ada file,
+    # sehingga tampilan awal "upload file" tetap ringan
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import rehandling_core as core
+    from rehandling_core import (
+        parse_shift_starts,
+        save_json,
+        load_json,
+        read_workbook,
+        prepare_dataset,
+        filter_by_date,
+        date_bounds,
+        filter_by_values,
+        get_value_by_status,
+        assign_targets,
+        days_in_current_month,
+        build_spph_summary,
+        build_rakor_table,
+        build_spph_mitra_table,
+        top_bottom_k,
+        skor_jarak,
+        truck_class,
+        rollup_match_factor,
+        route_distance_array,
+        lookup_route_distance,
+        rollup_productivity,
+        rolling_operator_totals,
+        operator_consistency_stats,
+        rank_operators,
+        build_html_snapshot,
+        content_hash,
+        dataset_key,
+        load_uploaded_dataset,
+        rebuild_filtered,
+        export_filtered,
+        build_dashboard_report,
+        current_rss_mb,
+        perf_entry,
+        timed_download
+    )
 
-    # Strip spaces and lowercase all column names for consistency
-    df.columns = df.columns.str.strip().str.lower()
+    # Fungsi perhitungan berat dari rehandling_core di-cache per dataset oleh Streamlit
+    compute_exca_loading = st.cache_data(core.compute_exca_loading)
+    compute_match_factor_cube = st.cache_data(core.compute_match_factor_cube)
+    compute_operator_ritase_matrix = st.cache_data(core.compute_operator_ritase_matrix)
+    compute_route_codes = st.cache_data(core.compute_route_codes)
+    compute_productivity_cube = st.cache_data(core.compute_productivity_cube)
+    compute_operator_daily_cumsum = st.cache_data(core.compute_operator_daily_cumsum)
+    compute_operator_shift_matrix = st.cache_data(core.compute_operator_shift_matrix)
+    compute_operator_row_index = st.cache_data(core.compute_operator_row_index)
+    compute_operator_exca_pairs = st.cache_data(core.compute_operator_exca_pairs)
+    compute_payload_histograms = st.cache_data(core.compute_payload_histograms)
+    export_dataset = st.cache_data(core.export_dataset, max_entries=8)
+    build_excel_report = st.cache_data(core.build_excel_report, max_entries=4)
+    compute_entity_aggregates = st.cache_data(core.compute_entity_aggregates)
+    compute_jam_dumping_sets = st.cache_data(core.compute_jam_dumping_sets)
+    compute_dumping_congestion = st.cache_data(core.compute_dumping_congestion)
+    # Usulan penggabungan nama operator di-cache per jumlah ritase per nama (isi expander selalu dijalankan)
+    suggest_operator_merges = st.cache_data(core.suggest_operator_merges, max_entries=4)
+
+    # Mode multi-user: dataset hasil ingest disimpan sekali per proses server (read-only) dan dipakai bersama
+    # semua sesi yang meng-upload file yang sama; sesi hanya menyimpan pilihan filter. Batas memori lewat
+    # env REHANDLING_DATASET_CACHE_MB (default 2048, dataset terlama dibuang utuh; 0 = tiap sesi parse sendiri).
+    shared_cache_mb = int(os.environ.get('REHANDLING_DATASET_CACHE_MB', 2048))
+
+    @st.cache_resource
+    def shared_dataset_cache(max_mb):
+        return core.DatasetCache(max_mb * 2**20)
 
-    # Check if 'date' column exists and convert to datetime
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'])
-    else:
-        st.error("Kolom 'Date' tidak ditemukan dalam dataset.")
-        st.stop()  # Stop execution if 'Date' column is missing
+    filename = fl.name
+    st.write(filename)
 
-    def get_value_by_status(df, status_name):
-        rows = df[df['status'] == status_name]
-        if not rows.empty:
-            return float(rows['tonase'].sum())
+    # File paths for storing targets
+    rakor_targets_file = 'rakor_targets.json'
+    spph_mitra_targets_file = 'spph_mitra_targets.json'
+    shift_calendar_file = 'shift_calendar.json'
+    route_distances_file = 'route_distances.json'
+    operator_aliases_file = 'operator_aliases.json'
+    truck_payloads_file = 'truck_payloads.json'
+
+    # Kalender shift operasional (jam mulai tiap shift disimpan sekali di json file local)
+    shift_calendar = load_json(shift_calendar_file)
+    st.sidebar.header("Kalender Shift Operasional:")
+    shift_starts_text = st.sidebar.text_input(
+        "Jam mulai shift (HH:MM, pisahkan dengan koma)",
+        value=", ".join(shift_calendar.get('shift_starts', ["06:00", "18:00"]))
+    )
+    try:
+        shift_starts = parse_shift_starts(shift_starts_text)
+    except ValueError:
+        st.sidebar.error("Format jam mulai shift tidak valid, memakai 06:00, 18:00.")
+        shift_starts = [6 * 60, 18 * 60]
+    save_json(shift_calendar_file, {'shift_starts': [f"{m // 60:02d}:{m % 60:02d}" for m in shift_starts]})
+
+    # Jam dumping dipetakan ke hari/shift operasional dan nama operator dinormalisasi + alias, sekali saat ingest
+    operator_aliases = load_json(operator_aliases_file)
+
+    # Check file extension and load accordingly (kolom dirapikan, 'date' dijadikan datetime)
+    def load_dataset():
+        with perf_stage("upload: parse file") as perf:
+            data = read_workbook(fl, filename)
+            perf['rows_out'] = len(data)
+        with perf_stage("upload: jam/shift/alias", len(data)) as perf:
+            data = prepare_dataset(data, shift_starts, operator_aliases)
+            perf['rows_out'] = len(data)
+        return data
+
+    try:
+        if shared_cache_mb > 0:
+            # Hash isi file dihitung sekali per upload di sesi ini
+            if st.session_state.get('upload_hash', (None, None))[0] != fl.file_id:
+                st.session_state['upload_hash'] = (fl.file_id, content_hash(fl.getvalue()))
+            key = dataset_key(st.session_state['upload_hash'][1], filename, shift_starts, operator_aliases)
+            with perf_stage("upload: dataset bersama") as perf:
+                df = shared_dataset_cache(shared_cache_mb).get_or_load(key, load_dataset)
+                perf['rows_out'] = len(df)
         else:
-            return 0.00
+            df = load_dataset()
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()  # Stop execution if the file type is not supported or 'Date' column is missing
+
+    # Dataset lengkap untuk unduhan (dibaca lagi saat tombol diklik): dari cache bersama, atau parse ulang file
+    # upload bila cache bersama dimatikan. Callable unduhan tidak menyimpan frame hasil filter sesi ini.
+    upload_loader = partial(load_uploaded_dataset, fl, filename, shift_starts, operator_aliases)
+    load_full_dataset = partial(shared_dataset_cache(shared_cache_mb).get_or_load, key, upload_loader) if shared_cache_mb > 0 else upload_loader
 
     # Layout for Date selection
     col1, col2 = st.columns(2)
-    startDate = df['date'].min()
-    endDate = df['date'].max()
+    startDate, endDate = date_bounds(df)
 
     with col1:
         date1 = st.date_input("Start Date", startDate)
@@ -100,46 +283,37 @@ if fl is not None:
         st.stop()
 
     # Filter data based on date
-    df = df[(df["date"] >= pd.to_datetime(date1)) & (df["date"] <= pd.to_datetime(date2))].copy()
+    with perf_stage("filter tanggal", len(df)) as perf:
+        df = filter_by_date(df, date1, date2)
+        perf['rows_out'] = len(df)
 
     # Sidebar filters
+    perf_start = (time.perf_counter(), current_rss_mb())
     st.sidebar.header("Choose your filter: ")
 
     # Filter by Shift
     shift = st.sidebar.multiselect("Select Shift", df["shift"].unique())
-    df_filtered = df[df["shift"].isin(shift)] if shift else df.copy()
+    df_filtered = filter_by_values(df, "shift", shift)
 
     # Filter by Dump Truck
     dump_truck = st.sidebar.multiselect("Select Dump Truck", df_filtered["dump truck"].unique())
-    df_filtered = df_filtered[df_filtered["dump truck"].isin(dump_truck)] if dump_truck else df_filtered
+    df_filtered = filter_by_values(df_filtered, "dump truck", dump_truck)
 
     # Filter by Excavator (Exca)
     exca = st.sidebar.multiselect("Select Excavator", df_filtered["exca"].unique())
-    df_filtered = df_filtered[df_filtered["exca"].isin(exca)] if exca else df_filtered
+    df_filtered = filter_by_values(df_filtered, "exca", exca)
 
     # Filter by Loading Point and Dumping Point
     loading_point = st.sidebar.multiselect("Select Loading Point", df_filtered["loading point"].unique())
-    df_filtered = df_filtered[df_filtered["loading point"].isin(loading_point)] if loading_point else df_filtered
+    df_filtered = filter_by_values(df_filtered, "loading point", loading_point)
 
     dumping_point = st.sidebar.multiselect("Select Dumping Point", df_filtered["dumping point"].unique())
-    df_filtered = df_filtered[df_filtered["dumping point"].isin(dumping_point)] if dumping_point else df_filtered
-
-    # File paths for storing targets
-    rakor_targets_file = 'rakor_targets.json'
-    spph_mitra_targets_file = 'spph_mitra_targets.json'
-
-    # Function to load target values from JSON
-    def load_json(file_path):
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        return {}
-
-    # Function to save target values to JSON
-    def save_json(file_path, data):
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+    df_filtered = filter_by_values(df_filtered, "dumping point", dumping_point)
+    sidebar_filters = {'shift': shift, 'dump truck': dump_truck, 'exca': exca, 'loading point': loading_point, 'dumping point': dumping_point}
+    if perf_debug:
+        perf_record("filter sidebar", *perf_start, len(df), len(df_filtered))
 
+    perf_start, perf_rows_in = (time.perf_counter(), current_rss_mb()), len(df_filtered)
     # Load existing rakor targets if available
     rakor_targets = load_json(rakor_targets_file)
 
@@ -158,10 +332,7 @@ if fl is not None:
     # Save the rakor targets to JSON after input
     save_json(rakor_targets_file, new_rakor_targets)
 
-    # Map target rakor to dataset
-    if 'status' in df_filtered.columns:
-        df_filtered['target_rakor'] = df_filtered['status'].map(new_rakor_targets).fillna(0)
-    else:
+    if 'status' not in df_filtered.columns:
         st.error("Kolom 'status' tidak ditemukan dalam dataset.")
 
     # Input tanggal awal dan akhir untuk menentukan periode rakor
@@ -174,7 +345,7 @@ if fl is not None:
         num_days_rakor = (end_date - start_date).days + 1
         if num_days_rakor > 0:
             st.sidebar.write(f"Total hari dalam periode rakor: {num_days_rakor} hari")
-            
+        
             st.sidebar.header("Pembagian Target Rakor:")
             for key, value in new_rakor_targets.items():
                 target_harian = value / num_days_rakor  
@@ -188,10 +359,6 @@ if fl is not None:
     else:
         st.sidebar.write("Silakan masukkan periode rakor yang valid.")
 
-    # Assign daily and weekly target rakor to the dataframe
-    df_filtered['target_rakor_harian'] = df_filtered['target_rakor'] / num_days_rakor
-    df_filtered['target_rakor_mingguan'] = df_filtered['target_rakor_harian'] * 7
-
     # Load existing SPPH/Mitra targets if available
     spph_mitra_targets = load_json(spph_mitra_targets_file)
 
@@ -204,39 +371,22 @@ if fl is not None:
     # Save the SPPH/Mitra targets to JSON after input
     save_json(spph_mitra_targets_file, new_spph_mitra_targets)
 
-    # Map target SPPH/Mitra to dataset
-    if 'spph' in df_filtered.columns:
-        df_filtered['target_spph_mitra'] = df_filtered['spph'].map(new_spph_mitra_targets).fillna(0)
-    else:
-        st.error("Kolom 'SPPH' tidak ditemukan dalam dataset.")
-
-    # Assign daily and weekly target SPPH/Mitra to the dataframe
-    df_filtered['target_spph_mitra_harian'] = df_filtered['target_spph_mitra'] / num_days_rakor
-    df_filtered['target_spph_mitra_mingguan'] = df_filtered['target_spph_mitra_harian'] * 7
+    # Map target rakor dan SPPH/Mitra (bulanan, harian, mingguan) to dataset.
+    # Perhitungan ter-cache memakai df_selected (sebelum kolom target) agar edit target tidak menghitung ulang cache.
+    df_selected = df_filtered
+    df_filtered = assign_targets(df_filtered, new_rakor_targets, new_spph_mitra_targets, num_days_rakor)
+    if perf_debug:
+        perf_record("input target rakor/SPPH", *perf_start, perf_rows_in, len(df_filtered))
 
     # Tonase and SPPH Analysis
     col1, col2 = st.columns(2)
 
     # Category-wise (SPPH) bar chart
     with col1:
-        st.subheader("SPPH Analysis")
+        section_header("SPPH Analysis")
         
-        # Grouping data by SPPH
-        spph_df = df_filtered.groupby("spph", as_index=False)["tonase"].sum()
-
-        # Menghitung SGJTotal dari penjumlahan SGJ1, SGJ2, SGJ3, dan SPARE
-        sgj_total = spph_df[spph_df["spph"].isin(["SGJ1", "SGJ2", "SGJ3", "SPARE"])]["tonase"].sum()
-
-        # Menambahkan SGJTotal ke dataframe
-        sgj_total_row = pd.DataFrame({"spph": ["SGJTotal"], "tonase": [sgj_total]})
-        spph_df = pd.concat([spph_df, sgj_total_row], ignore_index=True)
-
-        # Menghitung Grand Total dari seluruh tonase kecuali SGJTotal
-        grand_total = spph_df[spph_df["spph"] != "SGJTotal"]["tonase"].sum()
-
-        # Menambahkan Grand Total sebagai baris baru ke spph_df
-        grand_total_row = pd.DataFrame({"spph": ["Grand Total"], "tonase": [grand_total]})
-        spph_df = pd.concat([spph_df, grand_total_row], ignore_index=True)
+        # Grouping data by SPPH (ditambah SGJTotal dan Grand Total)
+        spph_df = build_spph_summary(df_filtered)
 
         # Membuat grafik interaktif untuk SPPH/Mitra
         fig = px.bar(spph_df, 
@@ -248,25 +398,18 @@ if fl is not None:
         fig.update_traces(marker_line_width=1, opacity=0.8)
         
         # Tampilkan grafik
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
 
 
     # Shift-wise tonnage pie chart
     with col2:
-        st.subheader("Shift-wise Tonage")
-        fig = px.pie(df_filtered, values="tonase", names="shift", hole=0.5)
-        st.plotly_chart(fig, use_container_width=True)
-
-    import calendar
-    from datetime import datetime
-
-    # Mendapatkan bulan dan tahun saat ini
-    current_year = datetime.now().year
-    current_month = datetime.now().month
+        section_header("Shift-wise Tonage")
+        # Tonase dijumlahkan per shift dulu agar grafik hanya membawa data agregat
+        fig = px.pie(df_filtered.groupby("shift", as_index=False)["tonase"].sum(), values="tonase", names="shift", hole=0.5)
+        show_chart(fig)
 
     # Menghitung jumlah hari dalam bulan ini
-    DAYS_IN_MONTH = calendar.monthrange(current_year, current_month)[1]
-    WEEKS_IN_MONTH = DAYS_IN_MONTH / 7
+    DAYS_IN_MONTH = days_in_current_month()
     st.markdown(
     """
     <hr style="border: 1px solid red;" />
@@ -275,51 +418,15 @@ if fl is not None:
 )
 
     # Target Rakor Analysis
-    st.subheader("Target Rakor vs Actual Comparison")
-
-    # Pengelompokan dan agregasi
-    rakor_df = df_filtered.groupby("status", as_index=False).agg({
-        "tonase": "sum", 
-        "target_rakor": "first"
-    })
-
-    # Menghitung target harian dan mingguan berdasarkan target bulanan
-    rakor_df["target_rakor_harian"] = (rakor_df["target_rakor"] / DAYS_IN_MONTH).round(2)
-    rakor_df["target_rakor_mingguan"] = (rakor_df["target_rakor"] / WEEKS_IN_MONTH).round(2)
-
-    # Menghitung perbedaan dan pencapaian persentase
-    rakor_df["difference"] = rakor_df.apply(
-        lambda row: round(max(row["target_rakor"] - row["tonase"], 0), 2) if row["target_rakor"] > 0 else 0, axis=1
-    )
-    rakor_df["percent achievement"] = rakor_df.apply(
-        lambda row: round((row["tonase"] / row["target_rakor"] * 100), 2) if row["target_rakor"] > 0 else 0, axis=1
-    )
-
-    # Membulatkan tonase dan target_rakor di DataFrame
-    rakor_df["tonase"] = rakor_df["tonase"].round(2)  # Pembulatan ke bilangan bulat
-    rakor_df["target_rakor"] = rakor_df["target_rakor"].round(2)  # Pembulatan ke bilangan bulat
+    section_header("Target Rakor vs Actual Comparison")
 
-    # Menghilangkan Housekeeping dari total
-    rakor_df_no_housekeeping = rakor_df.loc[rakor_df["status"] != "Housekeeping"]
-
-    # Menambahkan baris total tanpa Housekeeping
-    total_row = pd.DataFrame({
-        "status": ["Total"],
-        "tonase": [round(rakor_df_no_housekeeping["tonase"].sum(), 0)],  # Total tonase tanpa Housekeeping
-        "target_rakor": [round(rakor_df_no_housekeeping["target_rakor"].sum(), 0)],  # Total target_rakor tanpa Housekeeping
-        "target_rakor_harian": [round(rakor_df_no_housekeeping["target_rakor_harian"].sum(), 2)],  # Total target_rakor_harian tanpa Housekeeping
-        "target_rakor_mingguan": [round(rakor_df_no_housekeeping["target_rakor_mingguan"].sum(), 2)],  # Total target_rakor_mingguan tanpa Housekeeping
-        "difference": [round(rakor_df_no_housekeeping["difference"].sum(), 2)],  # Total difference tanpa Housekeeping
-        "percent achievement": [round(rakor_df_no_housekeeping["percent achievement"].mean(), 2)]  # Rata-rata percent achievement tanpa Housekeeping
-    })
-
-    # Menggabungkan baris total ke akhir DataFrame
-    rakor_df = pd.concat([rakor_df, total_row], ignore_index=True)
+    # Pengelompokan, target harian/mingguan, pencapaian dan baris Total
+    rakor_df = build_rakor_table(df_filtered, DAYS_IN_MONTH)
 
     # Mengatur ulang indeks dan menampilkan DataFrame
     rakor_df.reset_index(drop=True, inplace=True)  # Mengatur ulang indeks dan menghapus indeks lama
     rakor_df.index = [*range(1, len(rakor_df) + 1)]  # Membuat indeks baru mulai dari 1
-    st.dataframe(rakor_df)
+    show_table(rakor_df)
 
     # Menampilkan filter interaktif untuk memilih status yang ingin dilihat
     status_options = rakor_df['status'].unique()
@@ -348,21 +455,11 @@ if fl is not None:
         for trace in fig_rakor.data:
             trace.text = [str(int(value)) for value in trace.y]  # Mengonversi nilai ke bilangan bulat dan ke string
 
-        st.plotly_chart(fig_rakor, use_container_width=True)
+        show_chart(fig_rakor)
     else:
         st.write("Tidak ada data yang tersedia untuk status yang dipilih.")
 
 
-    import calendar
-    from datetime import datetime
-
-    # Mendapatkan bulan dan tahun saat ini
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-
-    # Menghitung jumlah hari dalam bulan ini
-    DAYS_IN_MONTH = calendar.monthrange(current_year, current_month)[1]  # Mengembalikan jumlah hari dalam bulan ini
-    WEEKS_IN_MONTH = DAYS_IN_MONTH / 7
     st.markdown(
     """
     <hr style="border: 1px solid red;" />
@@ -371,60 +468,14 @@ if fl is not None:
 )
 
     # Target SPPH/Mitra Analysis
-    st.subheader("Target SPPH/Mitra vs Actual Comparison")
-
-    # Grouping and aggregation
-    spph_mitra_df = df_filtered.groupby("spph", as_index=False).agg({
-        "tonase": "sum", 
-        "target_spph_mitra": "first"
-    })
-
-    # Menghitung SGJ Total dari SGJ1, SGJ2, SGJ3, dan SPARE
-    sgj_total_tonase = spph_mitra_df[spph_mitra_df['spph'].isin(['SGJ1', 'SGJ2', 'SGJ3', 'SPARE'])]['tonase'].sum()
-    sgj_total_target = spph_mitra_df[spph_mitra_df['spph'].isin(['SGJ1', 'SGJ2', 'SGJ3', 'SPARE'])]['target_spph_mitra'].sum()
-
-    # Menambahkan baris SGJ Total ke DataFrame
-    sgj_total_row = pd.DataFrame({
-        "spph": ["SGJ Total"],
-        "tonase": [round(sgj_total_tonase, 2)],  # Membulatkan tonase
-        "target_spph_mitra": [round(sgj_total_target, 2)],  # Membulatkan target
-        "target_spph_mitra_harian": [round(sgj_total_target / DAYS_IN_MONTH, 2)],  # Membulatkan target harian
-        "target_spph_mitra_mingguan": [round(sgj_total_target / WEEKS_IN_MONTH, 2)],  # Membulatkan target mingguan
-        "difference": [round(max(sgj_total_target - sgj_total_tonase, 0), 2)],  # Membulatkan perbedaan
-        "percent achievement": [round((sgj_total_tonase / sgj_total_target * 100), 2) if sgj_total_target > 0 else 0]  # Membulatkan pencapaian persentase
-    })
-
-    # Menghitung target harian dan mingguan berdasarkan target bulanan
-    spph_mitra_df["tonase"] = spph_mitra_df["tonase"].round(2)
-    spph_mitra_df["target_spph_mitra_harian"] = spph_mitra_df["target_spph_mitra"] / DAYS_IN_MONTH
-    spph_mitra_df["target_spph_mitra_harian"] = spph_mitra_df["target_spph_mitra_harian"].round(2)
-    spph_mitra_df["target_spph_mitra_mingguan"] = spph_mitra_df["target_spph_mitra"] / WEEKS_IN_MONTH
-    spph_mitra_df["target_spph_mitra_mingguan"] = spph_mitra_df["target_spph_mitra_mingguan"].round(2)
-
-    # Menghitung perbedaan dan pencapaian persentase
-    spph_mitra_df["difference"] = spph_mitra_df.apply(lambda row: round(max(row["target_spph_mitra"] - row["tonase"], 0), 2) if row["target_spph_mitra"] > 0 else 0, axis=1)
-    spph_mitra_df["percent achievement"] = spph_mitra_df.apply(lambda row: round((row["tonase"] / row["target_spph_mitra"] * 100), 2) if row["target_spph_mitra"] > 0 else 0, axis=1)
-
-    # Menambahkan SGJ Total ke dalam DataFrame
-    spph_mitra_df = pd.concat([spph_mitra_df, sgj_total_row], ignore_index=True)
-
-    # Menambahkan baris Total tanpa SGJ Total
-    total_row2 = pd.DataFrame({
-        "spph": ["Total"],
-        "tonase": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["tonase"].sum(), 2)],
-        "target_spph_mitra": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["target_spph_mitra"].sum(), 2)],
-        "target_spph_mitra_harian": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["target_spph_mitra_harian"].sum(), 2)],
-        "target_spph_mitra_mingguan": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["target_spph_mitra_mingguan"].sum(), 2)],
-        "difference": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["difference"].sum(), 2)],
-        "percent achievement": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["percent achievement"].mean(), 2)]
-    })
-
-    # Menambahkan total_row2 ke DataFrame hanya sekali
-    spph_mitra_df = pd.concat([spph_mitra_df, total_row2], ignore_index=True)
+    section_header("Target SPPH/Mitra vs Actual Comparison")
+
+    # Grouping, target harian/mingguan, pencapaian, SGJ Total dan Total
+    spph_mitra_df = build_spph_mitra_table(df_filtered, DAYS_IN_MONTH)
 
     # Reset indeks dan tampilkan DataFrame
     spph_mitra_df.index = [*range(1, len(spph_mitra_df)), '']
-    st.dataframe(spph_mitra_df)
+    show_table(spph_mitra_df)
 
     # Menampilkan filter interaktif untuk memilih SPPH/Mitra yang ingin dilihat
     spph_options = spph_mitra_df['spph'].unique()
@@ -446,7 +497,7 @@ if fl is not None:
 
         # Membulatkan nilai di chart
         fig_spph_mitra.update_traces(texttemplate='%{y:.2f}')  # Membulatkan nilai yang ditampilkan pada grafik
-        st.plotly_chart(fig_spph_mitra, use_container_width=True)
+        show_chart(fig_spph_mitra)
     else:
         st.write("Tidak ada data yang tersedia untuk SPPH/Mitra yang dipilih.")
 
@@ -465,18 +516,103 @@ if fl is not None:
 )
 
 
-    # Fungsi untuk meng-encode gambar menjadi base64
-    def get_base64_image(image_path):
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode()
+    # Grafik peringkat dengan warna Top 1, 2, 3 (dipakai semua leaderboard)
+    def plot_ranking(data, x, y, title, labels):
+        data = data.copy()
+        data['color'] = set_color_rank(data)
+        fig = px.bar(
+            data,
+            x=x,
+            y=y,
+            title=title,
+            labels=labels,
+            template="plotly_dark",
+            width=1200,
+            height=500,
+            color='color',
+            color_discrete_map={
+                "Top 1": "#ffb31a",      # Emas untuk Top 1
+                "Top 2": "#C0C0C0",    # Perak untuk Top 2
+                "Top 3": "#CD7F32",    # Perunggu untuk Top 3
+                "Top 4-10": "#ADD8E6"  # Biru Muda untuk lainnya
+            }
+        )
 
-    # Path ke gambar lokal
-    image_path = "assets/RBPab.png"
-    encoded_image = get_base64_image(image_path)
+        # Menambahkan gambar di sudut kanan atas di luar area plot
+        fig.add_layout_image(
+            dict(
+                source="data:image/png;base64," + image_base64,
+                xref="paper", yref="paper",
+                x=1.00, y=1.55,
+                sizex=0.65, sizey=0.65,
+                xanchor="right", yanchor="top"
+            )
+        )
+
+        fig.update_layout(
+            bargap=0.6, bargroupgap=0.2,
+            xaxis_tickangle=-45,
+            xaxis_tickfont=dict(size=12),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(size=15, color="white")
+        )
+        fig.update_traces(marker_line_color='black', marker_line_width=1.5)
+        return fig
+
+    # Leaderboard generik: entitas + metrik apa pun memakai agregat ter-cache dan top_bottom_k
+    def render_leaderboard(df, entity_column, entity_label, key):
+        aggregates = compute_entity_aggregates(df, entity_column)
+        # label: (metrik, lebih kecil lebih baik)
+        metric_options = {"Ritase": ('ritase', False), "Tonase": ('tonase', False)}
+        if 'tonase_route' in aggregates:
+            metric_options["Ton-Km"] = ('ton_km', False)
+        if 'siklus_menit' in aggregates:
+            metric_options["Waktu Siklus (menit)"] = ('siklus_menit', True)
+        selected_metric = st.selectbox("Pilih Metrik", list(metric_options.keys()), key=f"metric_{key}")
+        metric, lower_is_better = metric_options[selected_metric]
+
+        if metric == 'ton_km':
+            _, loading_points, dumping_points = compute_route_codes(df)
+            values = aggregates['tonase_route'] @ route_distance_array(load_json(route_distances_file), loading_points, dumping_points)
+        else:
+            values = aggregates[metric]
+
+        top_idx, bottom_idx = top_bottom_k(values, 10)
+        order = np.flatnonzero(values > 0)
+        order = order[np.argsort(values[order] if lower_is_better else -values[order], kind='stable')]
+        entities = aggregates['entities']
+        chart_labels = {'nilai': selected_metric, 'entitas': entity_label}
+
+        # Grafik kiri (warna peringkat) selalu entitas terbaik: waktu siklus terbaik adalah yang tercepat
+        if lower_is_better:
+            best_idx, worst_idx, best_title, worst_title = bottom_idx, top_idx, "Terendah (Tercepat)", "Tertinggi (Terlama)"
+        else:
+            best_idx, worst_idx, best_title, worst_title = top_idx, bottom_idx, "Tertinggi", "Terendah"
+
+        col1, col2 = st.columns(2)
+        with col1:
+            show_chart(plot_ranking(
+                pd.DataFrame({'entitas': entities[best_idx], 'nilai': values[best_idx].round(2)}),
+                'entitas', 'nilai', f"Top 10 {entity_label} dengan {selected_metric} {best_title}", chart_labels
+            ))
+        with col2:
+            show_chart(plot_ranking(
+                pd.DataFrame({'entitas': entities[worst_idx], 'nilai': values[worst_idx].round(2)}),
+                'entitas', 'nilai', f"Top 10 {entity_label} dengan {selected_metric} {worst_title}", chart_labels
+            ))
+
+        ranking_df = pd.DataFrame({
+            entity_label: entities[order],
+            selected_metric: values[order].round(2),
+            'Total Ritase': aggregates['ritase'][order].astype(int)
+        })
+        ranking_df.index = ranking_df.index + 1
+        show_table(ranking_df)
 
     # Jam Dumping Analysis
     if 'jam dumping' in df_filtered.columns:
-        st.subheader("Jam Dumping Analysis")
+        section_header("Jam Dumping Analysis")
 
         try:
             # Form untuk memilih filter dan tombol Refresh
@@ -487,163 +623,157 @@ if fl is not None:
                 selected_mitra = st.multiselect("Pilih SPPH/Mitra", mitra_options, default=mitra_options)
 
                 # Filter by Dump Truck (if available in the dataset)
-                truck_options = ['Semua Dump Truck'] + df_filtered['dump_truck'].unique().tolist() if 'dump_truck' in df_filtered.columns else ['Semua Dump Truck']
+                truck_options = ['Semua Dump Truck'] + df_filtered['dump truck'].unique().tolist() if 'dump truck' in df_filtered.columns else ['Semua Dump Truck']
                 selected_truck = st.selectbox("Pilih Dump Truck", truck_options)
 
                 # Filter by Lokasi (if available in the dataset)
                 lokasi_options = ['Semua Lokasi'] + df_filtered['lokasi'].unique().tolist() if 'lokasi' in df_filtered.columns else ['Semua Lokasi']
                 selected_lokasi = st.selectbox("Pilih Lokasi", lokasi_options)
 
-                # Filter by date range
-                date_min = pd.to_datetime(df_filtered['date']).min()
-                date_max = pd.to_datetime(df_filtered['date']).max()
+                # Filter by date range (hari operasional)
+                date_min = df_filtered['tanggal_operasional'].min()
+                date_max = df_filtered['tanggal_operasional'].max()
                 selected_date_range = st.date_input("Pilih Rentang Tanggal", [date_min, date_max])
 
-                # Filter by period (daily/weekly/monthly)
-                period_options = ["Harian", "Mingguan", "Bulanan"]
-                selected_period = st.radio("Pilih Periode", period_options)
-
                 refresh_button = st.form_submit_button("Refresh Data")
 
-            # Jika tombol Refresh ditekan, jalankan proses
+            # Simpan pilihan form saat Refresh ditekan; hasil tetap tampil ketika periode/grafik diganti
             if refresh_button:
-                # 1. Filter by selected_mitra, including SGJTotal handling
-                if selected_mitra:
-                    if "SGJTotal" in selected_mitra:
-                        sgj_filter = df_filtered['spph'].isin(['SGJ1', 'SGJ2', 'SGJ3', 'SPARE'])
-                        df_sgj_total = df_filtered[sgj_filter]
-                        other_mitra = [m for m in selected_mitra if m != "SGJTotal"]
-                        df_filtered_period = pd.concat([df_filtered[df_filtered['spph'].isin(other_mitra)], df_sgj_total]) if other_mitra else df_sgj_total
-                    else:
-                        df_filtered_period = df_filtered[df_filtered['spph'].isin(selected_mitra)]
-
-                # 2. Filter by selected_truck
-                if selected_truck != "Semua Dump Truck":
-                    df_filtered_period = df_filtered_period[df_filtered_period['dump_truck'] == selected_truck]
-
-                # 3. Filter by selected_lokasi
-                if selected_lokasi != "Semua Lokasi":
-                    df_filtered_period = df_filtered_period[df_filtered_period['lokasi'] == selected_lokasi]
-
-                # 4. Filter by selected_date_range
-                df_filtered_period = df_filtered_period[
-                    (pd.to_datetime(df_filtered_period['date']) >= pd.to_datetime(selected_date_range[0])) &
-                    (pd.to_datetime(df_filtered_period['date']) <= pd.to_datetime(selected_date_range[1]))
-                ]
-
-                # Hanya kolom jam_dumping yang tidak kosong dan parsing ke datetime sekali saja
-                df_filtered_period = df_filtered_period.dropna(subset=['jam dumping'])
-                df_filtered_period['datetime_dumping'] = pd.to_datetime(
-                    df_filtered_period['date'].astype(str) + ' ' + df_filtered_period['jam dumping'], errors='coerce'
+                st.session_state['jam_dumping_selection'] = (
+                    selected_mitra, selected_truck, selected_lokasi,
+                    selected_date_range[0], selected_date_range[-1]
+                )
+
+            if 'jam_dumping_selection' in st.session_state:
+                selected_mitra, selected_truck, selected_lokasi, date_start, date_end = st.session_state['jam_dumping_selection']
+                jam_dumping_sets, gagal_parse = compute_jam_dumping_sets(
+                    df_selected, selected_mitra, selected_truck, selected_lokasi, date_start, date_end
                 )
 
                 # Buang data yang tidak bisa di-parse ke datetime
-                if df_filtered_period['datetime_dumping'].isnull().any():
-                    st.warning(f"Total {df_filtered_period['datetime_dumping'].isnull().sum()} data 'Jam Dumping' gagal di-parse.")
-                    df_filtered_period = df_filtered_period.dropna(subset=['datetime_dumping'])
-
-                # Tambahkan kolom 'hour' untuk grouping dan set kolom 'ritase'
-                df_filtered_period['hour'] = df_filtered_period['datetime_dumping'].dt.hour
-                df_filtered_period['ritase'] = 1
-
-                # Hitung jumlah hari total
-                total_days = (pd.to_datetime(selected_date_range[1]) - pd.to_datetime(selected_date_range[0])).days + 1
-
-                # Pengelompokan sesuai periode yang dipilih
-                if selected_period == "Harian":
-                    df_filtered_period['day'] = df_filtered_period['datetime_dumping'].dt.date
-                    jam_dumping_df = df_filtered_period.groupby(["day", "hour"], as_index=False).agg(
-                        total_tonase=('tonase', 'sum'),
-                        total_ritase=('ritase', 'sum')
+                if gagal_parse:
+                    st.warning(f"Total {gagal_parse} data 'Jam Dumping' gagal di-parse.")
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    # Filter by period (daily/weekly/monthly/total)
+                    period_options = list(jam_dumping_sets.keys())
+                    selected_period = st.radio("Pilih Periode", period_options, horizontal=True)
+                with col2:
+                    chart_options = ["Tonase & Rata-rata Ritase", "Tonase", "Rata-rata Ritase"]
+                    selected_chart = st.radio("Pilih Grafik", chart_options, horizontal=True)
+
+                jam_dumping_df = jam_dumping_sets[selected_period]
+                # Sumbu jam dimulai dari jam mulai shift pertama agar jam 0-6 ikut shift malam sebelumnya
+                hour_order = [(shift_starts[0] // 60 + i) % 24 for i in range(24)]
+                fig_title = f"Jam Dumping {selected_period}"
+                # Satu garis per hari/minggu/bulan agar grafik tidak saling tumpuk
+                period_column = {"Harian": "day", "Mingguan": "week", "Bulanan": "month"}.get(selected_period)
+                subtitle = f'{", ".join(selected_mitra)}, {selected_truck}, {selected_lokasi}'
+
+                if selected_chart != "Rata-rata Ritase":
+                    # Membuat grafik total tonase
+                    fig_jam_dumping = px.line(
+                        jam_dumping_df,
+                        x="hour",
+                        y="total_tonase",
+                        color=period_column,
+                        title=f'{fig_title} vs Tonase ({subtitle})',
+                        labels={'total_tonase': 'Total Tonase', 'hour': 'Jam Dumping (Hour)'},
+                        template="plotly_dark",
+                        color_discrete_sequence=['#00CC96'] if period_column is None else None
                     )
-                    fig_title = "Jam Dumping Harian"
-                elif selected_period == "Mingguan":
-                    df_filtered_period['week'] = df_filtered_period['datetime_dumping'].dt.isocalendar().week
-                    jam_dumping_df = df_filtered_period.groupby(["week", "hour"], as_index=False).agg(
-                        total_tonase=('tonase', 'sum'),
-                        total_ritase=('ritase', 'sum')
+
+                    # Menambahkan gambar ke grafik
+                    fig_jam_dumping.add_layout_image(
+                        dict(
+                            source="data:image/png;base64," + image_base64,
+                            xref="paper", yref="paper",
+                            x=1.00, y=1.35,
+                            sizex=0.45, sizey=0.45,
+                            xanchor="right", yanchor="top"
+                        )
                     )
-                    fig_title = "Jam Dumping Mingguan"
-                else:
-                    df_filtered_period['month'] = df_filtered_period['datetime_dumping'].dt.to_period('M')
-                    jam_dumping_df = df_filtered_period.groupby(["month", "hour"], as_index=False).agg(
-                        total_tonase=('tonase', 'sum'),
-                        total_ritase=('ritase', 'sum')
+
+                    fig_jam_dumping.update_layout(
+                        xaxis=dict(type='category', categoryorder='array', categoryarray=hour_order),
+                        yaxis=dict(tickformat=','),
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(size=15, color="white")
                     )
-                    fig_title = "Jam Dumping Bulanan"
-
-                jam_dumping_df["total_tonase"] = jam_dumping_df["total_tonase"].round(2)
-                jam_dumping_df["total_ritase"] = jam_dumping_df["total_ritase"].round(2)
-                jam_dumping_df["avg_ritase"] = (jam_dumping_df["total_ritase"] / total_days).round(2)
-
-                # Membuat grafik total tonase
-                fig_jam_dumping = px.line(
-                    jam_dumping_df,
-                    x="hour",
-                    y="total_tonase",
-                    title=f'{fig_title} vs Tonase ({", ".join(selected_mitra)}, {selected_truck}, {selected_lokasi})',
-                    labels={'total_tonase': 'Total Tonase', 'hour': 'Jam Dumping (Hour)'},
-                    template="plotly_dark",
-                    color_discrete_sequence=['#00CC96']
-                )
 
-                # Menambahkan gambar ke grafik
-                fig_jam_dumping.add_layout_image(
-                    dict(
-                        source="data:image/png;base64," + encoded_image,
-                        xref="paper", yref="paper",
-                        x=1.00, y=1.35,
-                        sizex=0.45, sizey=0.45,
-                        xanchor="right", yanchor="top"
+                    show_chart(fig_jam_dumping)
+
+                # Match factor armada per loading point per jam, diambil dari cube yang sudah dihitung;
+                # pilihan mitra, dump truck dan lokasi form ini diterapkan saat rollup
+                if {'exca', 'loading point', 'dump truck'}.issubset(df_filtered.columns):
+                    mf_df = rollup_match_factor(
+                        compute_match_factor_cube(df_selected), date_start, date_end,
+                        (selected_mitra, selected_truck, selected_lokasi)
                     )
-                )
 
-                fig_jam_dumping.update_layout(
-                    xaxis=dict(tickmode='linear', tick0=0, dtick=1),
-                    yaxis=dict(tickformat=','),
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(size=15, color="white")
-                )
+                    fig_match_factor = px.line(
+                        mf_df,
+                        x="hour",
+                        y="match_factor",
+                        color="loading point",
+                        markers=True,
+                        title=f"Match Factor Armada per Loading Point per Jam ({subtitle})",
+                        labels={'match_factor': 'Match Factor', 'hour': 'Jam Dumping (Hour)'},
+                        template="plotly_dark"
+                    )
+                    # Match factor 1 = jumlah truk seimbang dengan kapasitas excavator
+                    fig_match_factor.add_hline(y=1, line_dash="dash", line_color="red")
+                    fig_match_factor.update_layout(
+                        xaxis=dict(type='category', categoryorder='array', categoryarray=hour_order),
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(size=15, color="white")
+                    )
+                    show_chart(fig_match_factor)
 
-                st.plotly_chart(fig_jam_dumping, use_container_width=True)
+                    with st.expander("Tabel Match Factor per Loading Point per Jam"):
+                        show_table(mf_df)
 
                 st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
 
-                # Grafik rata-rata ritase per jam dumping
-                fig_avg_ritase = px.line(
-                    jam_dumping_df,
-                    x="hour",
-                    y="avg_ritase",
-                    title=f'Rata-rata Ritase per {fig_title} ({", ".join(selected_mitra)}, {selected_truck}, {selected_lokasi})',
-                    labels={'avg_ritase': 'Rata-rata Ritase', 'hour': 'Jam Dumping (Hour)'},
-                    template="plotly_dark",
-                    color_discrete_sequence=['#FFA15A']
-                )
+                if selected_chart != "Tonase":
+                    # Grafik rata-rata ritase per jam dumping
+                    fig_avg_ritase = px.line(
+                        jam_dumping_df,
+                        x="hour",
+                        y="avg_ritase",
+                        color=period_column,
+                        title=f'Rata-rata Ritase per {fig_title} ({subtitle})',
+                        labels={'avg_ritase': 'Rata-rata Ritase', 'hour': 'Jam Dumping (Hour)'},
+                        template="plotly_dark",
+                        color_discrete_sequence=['#FFA15A'] if period_column is None else None
+                    )
 
-                # Menambahkan gambar di sudut kanan atas di luar area plot
-                fig_avg_ritase.add_layout_image(
-                    dict(
-                        source="data:image/png;base64," + encoded_image,
-                        xref="paper", yref="paper",
-                        x=1.01, y=1.35,
-                        sizex=0.45, sizey=0.45,
-                        xanchor="right", yanchor="top"
+                    # Menambahkan gambar di sudut kanan atas di luar area plot
+                    fig_avg_ritase.add_layout_image(
+                        dict(
+                            source="data:image/png;base64," + image_base64,
+                            xref="paper", yref="paper",
+                            x=1.01, y=1.35,
+                            sizex=0.45, sizey=0.45,
+                            xanchor="right", yanchor="top"
+                        )
                     )
-                )
 
-                fig_avg_ritase.update_layout(
-                    xaxis=dict(tickmode='linear', tick0=0, dtick=1),
-                    yaxis=dict(tickformat=','),
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(size=15, color="white")
-                )
+                    fig_avg_ritase.update_layout(
+                        xaxis=dict(type='category', categoryorder='array', categoryarray=hour_order),
+                        yaxis=dict(tickformat=','),
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(size=15, color="white")
+                    )
 
-                st.plotly_chart(fig_avg_ritase, use_container_width=True)
+                    show_chart(fig_avg_ritase)
 
                 st.subheader("Tabel Jam Dumping dan Rata-rata Ritase")
-                st.dataframe(jam_dumping_df)
+                show_table(jam_dumping_df)
 
                 csv_jam_dumping = jam_dumping_df.to_csv(index=False).encode('utf-8')
                 st.download_button(
@@ -660,133 +790,746 @@ if fl is not None:
 
     st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
 
+    # Excavator Loading Rate & Antrian Dump Truck
+    if {'exca', 'loading point', 'jam dumping'}.issubset(df_filtered.columns):
+        section_header("Excavator Loading Rate & Antrian Dump Truck")
+
+        try:
+            with st.form("filter_form_exca"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    batas_jeda = st.number_input("Batas jeda sesi (menit)", min_value=5.0, value=60.0, step=5.0)
+                with col2:
+                    batas_idle = st.number_input("Batas idle excavator / kurang truk (%)", min_value=0.0, max_value=100.0, value=30.0, step=5.0)
+                exca_options = sorted(df_filtered['exca'].dropna().astype(str).unique().tolist())
+                selected_exca = st.selectbox("Pilih Excavator untuk detail", exca_options)
+                refresh_button = st.form_submit_button("Refresh Data")
+
+            if refresh_button:
+                events, exca_summary, exca_index = compute_exca_loading(df_selected, batas_jeda)
 
+                exca_summary['kondisi'] = np.select(
+                    [exca_summary['idle_persen'] > batas_idle, exca_summary['rata2_antrian_truk'] >= 1],
+                    ['Kurang Truk', 'Antrian Truk'],
+                    default='Seimbang'
+                )
+
+                fig_exca = px.bar(
+                    exca_summary,
+                    x='exca',
+                    y='ritase_per_jam',
+                    color='kondisi',
+                    hover_data=['loading point', 'idle_persen', 'rata2_antrian_truk'],
+                    barmode='group',
+                    title='Ritase per Jam per Excavator dan Loading Point',
+                    labels={'ritase_per_jam': 'Ritase per Jam', 'exca': 'Excavator'},
+                    template="plotly_dark",
+                    color_discrete_map={
+                        "Kurang Truk": "#EF553B",
+                        "Antrian Truk": "#FFA15A",
+                        "Seimbang": "#00CC96"
+                    }
+                )
+                fig_exca.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(size=15, color="white")
+                )
+                show_chart(fig_exca)
+
+                show_table(exca_summary.sort_values('idle_persen', ascending=False).reset_index(drop=True))
+
+                # Drill-down satu excavator langsung dari index baris
+                if selected_exca in exca_index:
+                    exca_events = events.iloc[exca_index[selected_exca]]
+
+                    fig_exca_detail = px.line(
+                        exca_events,
+                        x='datetime_dumping',
+                        y=['jeda_menit', 'waktu_tunggu_menit'],
+                        title=f'Jeda Antar Truk dan Perkiraan Waktu Tunggu ({selected_exca})',
+                        labels={'value': 'Menit', 'datetime_dumping': 'Jam Dumping', 'variable': ''},
+                        template="plotly_dark"
+                    )
+                    fig_exca_detail.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(size=15, color="white")
+                    )
+                    show_chart(fig_exca_detail)
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {e}")
+
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+
+    # Kepadatan Dumping Point (jumlah dumping dalam jendela waktu bergulir)
+    if {'dumping point', 'jam dumping'}.issubset(df_filtered.columns):
+        section_header("Kepadatan Dumping Point")
+
+        try:
+            with st.form("filter_form_dumping_point"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    window_menit = st.number_input("Jendela waktu (menit)", min_value=1, value=10, step=1)
+                with col2:
+                    batas_padat = st.number_input("Batas padat (jumlah dumping per jendela)", min_value=1, value=5, step=1)
+                refresh_button = st.form_submit_button("Refresh Data")
+
+            if refresh_button:
+                arrivals = compute_dumping_congestion(df_selected, window_menit)
+                arrivals['melewati_batas'] = arrivals['jumlah_window'] > batas_padat
+
+                # Timeline diringkas per jendela waktu (nilai puncak) agar grafik tetap ringan
+                timeline_df = arrivals.groupby(
+                    ['dumping point', arrivals['datetime_dumping'].dt.floor(f'{int(window_menit)}min')], as_index=False
+                )['jumlah_window'].max()
+
+                fig_congestion = px.line(
+                    timeline_df,
+                    x='datetime_dumping',
+                    y='jumlah_window',
+                    color='dumping point',
+                    title=f'Jumlah Dumping dalam Jendela {int(window_menit)} Menit per Dumping Point',
+                    labels={'jumlah_window': 'Jumlah Dumping', 'datetime_dumping': 'Waktu Dumping'},
+                    template="plotly_dark"
+                )
+                fig_congestion.add_hline(y=batas_padat, line_dash="dash", line_color="red")
+                fig_congestion.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(size=15, color="white")
+                )
+                show_chart(fig_congestion)
+
+                # Puncak dan jumlah pelanggaran batas per hari
+                puncak_idx = arrivals.groupby(['day', 'dumping point'])['jumlah_window'].idxmax()
+                congestion_df = arrivals.loc[puncak_idx, ['day', 'dumping point', 'jumlah_window', 'datetime_dumping']].rename(
+                    columns={'jumlah_window': 'puncak_dumping', 'datetime_dumping': 'waktu_puncak'}
+                )
+                congestion_df['waktu_puncak'] = congestion_df['waktu_puncak'].dt.strftime('%H:%M')
+                congestion_df = congestion_df.merge(
+                    arrivals.groupby(['day', 'dumping point'], as_index=False).agg(
+                        total_ritase=('jumlah_window', 'size'),
+                        jumlah_melewati_batas=('melewati_batas', 'sum')
+                    ),
+                    on=['day', 'dumping point']
+                ).reset_index(drop=True)
+
+                st.subheader("Tabel Puncak Kepadatan Dumping Point per Hari")
+                show_table(congestion_df)
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {e}")
+
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
 
     # Pastikan 'nama operator' dan 'spph' ada di dalam dataset
     if 'nama operator' in df_filtered.columns and 'spph' in df_filtered.columns:
-        st.subheader("Top Operator Dump Truck Berdasarkan Ritase")
+        section_header("Top Operator Dump Truck Berdasarkan Ritase")
 
         try:
-            @st.cache_data
-            def process_data(df):
-                df['spph'] = df['spph'].replace({
-                    'SGJ1': 'SGJ',
-                    'SGJ2': 'SGJ',
-                    'SGJ3': 'SGJ',
-                    'SPARE': 'SGJ'
-                })
-                df['ritase'] = 1  # Setiap baris dihitung sebagai 1 ritase
-                return df
-
-            df_filtered = process_data(df_filtered)
-            mitra_options = df_filtered['spph'].unique().tolist()
+            # Usulan penggabungan nama operator (blocking + fuzzy), disetujui manual lalu disimpan ke tabel alias
+            with st.expander("Penggabungan Nama Operator"):
+                merge_suggestions = suggest_operator_merges(df['nama operator'].value_counts())
+                if merge_suggestions.empty:
+                    st.write("Tidak ada nama operator yang mirip.")
+                else:
+                    edited_suggestions = st.data_editor(
+                        merge_suggestions,
+                        disabled=['alias', 'nama_kanonik', 'alasan'],
+                        hide_index=True,
+                        key='operator_merge_editor'
+                    )
+                    disetujui = edited_suggestions[edited_suggestions['gabung']]
+                    if not disetujui.empty:
+                        operator_aliases.update(dict(zip(disetujui['alias'], disetujui['nama_kanonik'])))
+                        save_json(operator_aliases_file, operator_aliases)
+                        # Reset editor agar centang lama tidak terbawa ke daftar usulan yang baru
+                        del st.session_state['operator_merge_editor']
+                        st.rerun()
+                if operator_aliases:
+                    st.write("Tabel alias tersimpan:")
+                    show_table(pd.DataFrame(list(operator_aliases.items()), columns=['alias', 'nama_kanonik']), hide_index=True)
+
+            ritase_matrix, operator_labels, mitra_options, _, _ = compute_operator_ritase_matrix(df_selected)
 
             with st.form("filter_form"):
                 selected_mitra = st.multiselect("Pilih SPPH/Mitra", mitra_options, default=mitra_options, key="mitra_operator")
                 refresh_button = st.form_submit_button("Refresh Data")
 
+            # Simpan pilihan form agar tabel tetap tampil saat operator dipilih untuk detail
             if refresh_button:
-                @st.cache_data(hash_funcs={list: lambda x: hash(tuple(x))})
-                def compute_ritase(df, selected_mitra):
-                    if selected_mitra:
-                        df = df[df['spph'].isin(selected_mitra)]
-                    return df.groupby(['nama operator', 'spph'], as_index=False).agg(total_ritase=('ritase', 'sum'))
-
-                operator_ritase_df = compute_ritase(df_filtered, selected_mitra)
-                operator_ritase_df['operator_mitra'] = operator_ritase_df['nama operator'] + " (" + operator_ritase_df['spph'] + ")"
-                operator_ritase_df = operator_ritase_df.sort_values(by='total_ritase', ascending=False).reset_index(drop=True)
-
-                # Tentukan warna untuk Top 1, 2, 3 Tertinggi dan Terendah
-                top_10_operator = operator_ritase_df.head(10).copy()
-                bottom_10_operator = operator_ritase_df[operator_ritase_df['total_ritase'] > 0].tail(10).copy()
-
-                # Fungsi untuk mengatur warna berdasarkan peringkat
-                def set_color_rank(data):
-                    colors = []
-                    for i in range(len(data)):
-                        if i == 0:
-                            colors.append("Top 1")     # Warna Emas untuk Top 1
-                        elif i == 1:
-                            colors.append("Top 2")   # Warna Perak untuk Top 2
-                        elif i == 2:
-                            colors.append("Top 3")   # Warna Perunggu untuk Top 3
-                        else:
-                            colors.append("Top 4-10")  # Warna Biru Muda untuk yang lain
-                    return colors
-
-                # Terapkan fungsi pewarnaan pada top dan bottom operator
-                top_10_operator['color'] = set_color_rank(top_10_operator)
-                bottom_10_operator = bottom_10_operator.sort_values(by='total_ritase')  # Urutkan dari rendah ke tinggi
-                bottom_10_operator['color'] = set_color_rank(bottom_10_operator)
-
-                # Fungsi untuk membuat grafik dengan warna yang disesuaikan
-                def plot_ritase(data, title):
-                    fig = px.bar(
-                        data,
-                        x='operator_mitra',
-                        y='total_ritase',
-                        title=title,
-                        labels={'total_ritase': 'Total Ritase', 'operator_mitra': 'Nama Operator (Mitra)'},
-                        template="plotly_dark",
-                        width=1200,
-                        height=500,
-                        color='color',
-                        color_discrete_map={
-                            "Top 1": "#ffb31a",      # Emas untuk Top 1
-                            "Top 2": "#C0C0C0",    # Perak untuk Top 2
-                            "Top 3": "#CD7F32",    # Perunggu untuk Top 3
-                            "Top 4-10": "#ADD8E6"  # Biru Muda untuk lainnya
-                        }
-                    )
+                st.session_state['top_operator_selection'] = selected_mitra
 
-                    # Menambahkan gambar di sudut kanan atas di luar area plot
-                    fig.add_layout_image(
-                        dict(
-                            source="data:image/png;base64," + encoded_image,
-                            xref="paper", yref="paper",
-                            x=1.00, y=1.55,
-                            sizex=0.65, sizey=0.65,
-                            xanchor="right", yanchor="top"
-                        )
-                    )
+            if 'top_operator_selection' in st.session_state:
+                selected_mitra = [m for m in st.session_state['top_operator_selection'] if m in mitra_options]
+                mitra_rows = [mitra_options.index(m) for m in selected_mitra] if selected_mitra else list(range(len(mitra_options)))
+                total_ritase = ritase_matrix[mitra_rows].sum(axis=0)
 
-                    fig.update_layout(
-                        bargap=0.6, bargroupgap=0.2, 
-                        xaxis_tickangle=-45, 
-                        xaxis_tickfont=dict(size=12),
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)',
-                        font=dict(size=15, color="white")
-                    )
-                    fig.update_traces(marker_line_color='black', marker_line_width=1.5)
-                    return fig
+                # Top/Bottom 10 dengan argpartition; hanya tabel lengkap yang perlu diurutkan penuh
+                operator_ritase_df, top_idx, bottom_idx, order = rank_operators(total_ritase, operator_labels)
 
-                # Tampilkan grafik
-                st.plotly_chart(plot_ritase(top_10_operator, "Top 10 Operator Dump Truck dengan Ritase Tertinggi"), use_container_width=True)
-                st.plotly_chart(plot_ritase(bottom_10_operator, "Top 10 Operator Dump Truck dengan Ritase Terendah"), use_container_width=True)
+                # Top 10 tertinggi (urut turun) dan terendah (urut naik)
+                top_10_operator = pd.DataFrame({'operator_mitra': operator_labels[top_idx], 'total_ritase': total_ritase[top_idx]})
+                bottom_10_operator = pd.DataFrame({'operator_mitra': operator_labels[bottom_idx], 'total_ritase': total_ritase[bottom_idx]})
 
-                operator_ritase_df['Kategori'] = 'Di Luar Top 10'
-                operator_ritase_df.loc[operator_ritase_df['operator_mitra'].isin(top_10_operator['operator_mitra']), 'Kategori'] = 'Top 10 Tertinggi'
-                operator_ritase_df.loc[operator_ritase_df['operator_mitra'].isin(bottom_10_operator['operator_mitra']), 'Kategori'] = 'Top 10 Terendah'
-                operator_ritase_df['No'] = operator_ritase_df.index + 1
+                # Tampilkan grafik
+                operator_labels_chart = {'total_ritase': 'Total Ritase', 'operator_mitra': 'Nama Operator (Mitra)'}
+                show_chart(plot_ranking(top_10_operator, 'operator_mitra', 'total_ritase', "Top 10 Operator Dump Truck dengan Ritase Tertinggi", operator_labels_chart))
+                show_chart(plot_ranking(bottom_10_operator, 'operator_mitra', 'total_ritase', "Top 10 Operator Dump Truck dengan Ritase Terendah", operator_labels_chart))
 
                 st.subheader("Operator dengan Kategori Top 10 Tertinggi, Terendah, dan Di Luar Top 10")
-                st.dataframe(operator_ritase_df[['No', 'operator_mitra', 'total_ritase', 'Kategori']].set_index('No'))
+                st.caption("Klik satu baris untuk melihat detail operator.")
+                operator_table = show_table(
+                    operator_ritase_df[['No', 'operator_mitra', 'total_ritase', 'Kategori']].set_index('No'),
+                    on_select="rerun",
+                    selection_mode="single-row",
+                    key="operator_table"
+                )
+
+                # Detail operator diambil langsung dari index baris per operator
+                selected_rows = operator_table.selection.rows if operator_table is not None else []
+                if selected_rows and selected_rows[0] < len(order):
+                    pair_code = order[selected_rows[0]]
+                    operator_rows = df_selected.iloc[compute_operator_row_index(df_selected)[pair_code]]
+                    st.subheader(f"Detail Operator: {operator_labels[pair_code]}")
+
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Total Ritase", f"{len(operator_rows):,}")
+                    col2.metric("Total Tonase", f"{operator_rows['tonase'].sum():,.2f}")
+                    col3.metric("Tonase per Ritase", f"{operator_rows['tonase'].mean():,.2f}")
+
+                    col1, col2 = st.columns(2)
+                    if 'tanggal_operasional' in operator_rows.columns:
+                        with col1:
+                            daily_df = operator_rows.groupby('tanggal_operasional', as_index=False).agg(
+                                total_ritase=('tonase', 'size'), total_tonase=('tonase', 'sum')
+                            )
+                            fig_daily = px.bar(
+                                daily_df, x='tanggal_operasional', y='total_ritase',
+                                title="Ritase Harian",
+                                labels={'total_ritase': 'Total Ritase', 'tanggal_operasional': 'Tanggal Operasional'},
+                                template="plotly_dark", color_discrete_sequence=['#00CC96']
+                            )
+                            show_chart(fig_daily)
+                        with col2:
+                            hourly_df = operator_rows.groupby(['jam_operasional', 'hour'], as_index=False).agg(total_ritase=('tonase', 'size'))
+                            fig_hourly = px.bar(
+                                hourly_df, x='hour', y='total_ritase',
+                                title="Profil Jam Dumping",
+                                labels={'total_ritase': 'Total Ritase', 'hour': 'Jam Dumping (Hour)'},
+                                template="plotly_dark", color_discrete_sequence=['#FFA15A']
+                            )
+                            fig_hourly.update_layout(xaxis=dict(type='category', categoryorder='array', categoryarray=hourly_df['hour'].tolist()))
+                            show_chart(fig_hourly)
+
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.write("Dump Truck yang dikemudikan")
+                        show_table(operator_rows.groupby('dump truck', as_index=False).agg(
+                            total_ritase=('tonase', 'size'), total_tonase=('tonase', 'sum'), tonase_per_ritase=('tonase', 'mean')
+                        ).round(2).sort_values('total_ritase', ascending=False), hide_index=True)
+                    if {'loading point', 'dumping point'}.issubset(operator_rows.columns):
+                        with col2:
+                            st.write("Rute (Loading Point - Dumping Point)")
+                            show_table(operator_rows.groupby(['loading point', 'dumping point'], as_index=False).agg(
+                                total_ritase=('tonase', 'size'), total_tonase=('tonase', 'sum'), tonase_per_ritase=('tonase', 'mean')
+                            ).round(2).sort_values('total_ritase', ascending=False), hide_index=True)
 
                 csv = operator_ritase_df[['No', 'operator_mitra', 'total_ritase', 'Kategori']].reset_index().to_csv(index=False).encode('utf-8')
                 st.download_button(label="Download Tabel Operator", data=csv, file_name='operator_dump_truck.csv', mime='text/csv', key='download-csv')
 
+                # Konsistensi operator: ritase per shift kerja, variasi harian dan shift di bawah median armada
+                if {'tanggal_operasional', 'shift_operasional'}.issubset(df_filtered.columns):
+                    st.subheader("Konsistensi dan Variabilitas Operator")
+                    consistency_df, median_armada = operator_consistency_stats(compute_operator_shift_matrix(df_selected))
+                    consistency_df.insert(0, 'operator_mitra', operator_labels)
+                    consistency_df['mitra'] = np.asarray(mitra_options, dtype=object)[ritase_matrix.argmax(axis=0)]
+                    consistency_df = consistency_df[
+                        np.isin(ritase_matrix.argmax(axis=0), mitra_rows) & (consistency_df['shift_kerja'] > 0)
+                    ].round(2).reset_index(drop=True)
+                    st.write(f"Median armada: {median_armada:,.2f} ritase per shift")
+
+                    fig_consistency = px.scatter(
+                        consistency_df,
+                        x='ritase_per_shift',
+                        y='cv_harian',
+                        size='shift_kerja',
+                        color='mitra',
+                        hover_name='operator_mitra',
+                        hover_data=['total_ritase', 'persen_shift_di_bawah_median'],
+                        title="Ritase per Shift vs Koefisien Variasi Harian",
+                        labels={'ritase_per_shift': 'Ritase per Shift Kerja', 'cv_harian': 'Koefisien Variasi Harian'},
+                        template="plotly_dark"
+                    )
+                    fig_consistency.update_layout(
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font=dict(size=15, color="white")
+                    )
+                    show_chart(fig_consistency)
+                    show_table(consistency_df.sort_values('ritase_per_shift', ascending=False).reset_index(drop=True))
+
         except Exception as e:
             st.error(f"Terjadi kesalahan: {str(e)}")
     else:
         st.warning("Kolom 'Nama Operator' atau 'SPPH' tidak ditemukan dalam dataset.")
 
 
-    # Download options
-    csv_rakor = rakor_df.to_csv(index=False).encode('utf-8')
-    st.download_button("Download Target Rakor Comparison Data", data=csv_rakor, file_name="Target_rakor_comparison_data.csv", mime="text/csv")
+    # Leaderboard Excavator, Dump Truck dan Loading Point (mesin peringkat yang sama dengan Top Operator)
+    leaderboard_entities = [(c, label) for c, label in [('exca', 'Excavator'), ('dump truck', 'Dump Truck'), ('loading point', 'Loading Point')] if c in df_filtered.columns]
+    if leaderboard_entities:
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+        section_header("Leaderboard Excavator, Dump Truck dan Loading Point")
+
+        try:
+            for tab, (entity_column, entity_label) in zip(st.tabs([label for _, label in leaderboard_entities]), leaderboard_entities):
+                with tab:
+                    render_leaderboard(df_selected, entity_column, entity_label, key=entity_column)
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {str(e)}")
+
+    # Pasangan Operator x Excavator
+    if {'nama operator', 'spph', 'exca', 'jam dumping'}.issubset(df_filtered.columns):
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+        section_header("Pasangan Operator x Excavator")
+
+        try:
+            pairs = compute_operator_exca_pairs(df_selected)
+
+            with st.form("filter_form_pairing"):
+                pairing_metric_options = {
+                    "Waktu Siklus Tercepat": 'rata2_siklus_menit',
+                    "Ritase Terbanyak": 'total_ritase',
+                    "Tonase Terbanyak": 'total_tonase'
+                }
+                selected_pairing_metric = st.selectbox("Urutkan Berdasarkan", list(pairing_metric_options.keys()), key="metric_pairing")
+                min_ritase_pair = st.number_input("Minimal Ritase per Pasangan", min_value=1, value=5, step=1, key="min_ritase_pairing")
+                st.form_submit_button("Refresh Data")
+
+            metric = pairing_metric_options[selected_pairing_metric]
+            # Pasangan di bawah batas ritase diberi nilai 0 sehingga dilewati top_bottom_k
+            values = np.where(pairs['total_ritase'].to_numpy() >= min_ritase_pair, pairs[metric].to_numpy(dtype=float), 0)
+            top_idx, bottom_idx = top_bottom_k(values, 10)
+            best_idx = bottom_idx if metric == 'rata2_siklus_menit' else top_idx
+
+            best_pairs = pairs.iloc[best_idx].reset_index(drop=True)
+            best_pairs['pasangan'] = best_pairs['operator_mitra'] + " - " + best_pairs['exca']
+            pairing_labels = {
+                'pasangan': 'Operator (Mitra) - Excavator',
+                'rata2_siklus_menit': 'Rata-rata Waktu Siklus (menit)',
+                'total_ritase': 'Total Ritase',
+                'total_tonase': 'Total Tonase'
+            }
+            show_chart(plot_ranking(
+                best_pairs, 'pasangan', metric, f"Top 10 Pasangan Operator x Excavator - {selected_pairing_metric}", pairing_labels
+            ))
+
+            st.write(f"Jumlah pasangan: {len(pairs)} (memenuhi minimal ritase: {int(np.count_nonzero(values > 0))})")
+            best_pairs.index = best_pairs.index + 1
+            show_table(best_pairs.drop(columns=['pasangan']))
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {str(e)}")
+
+    # Leaderboard operator bergulir (harian / 7 hari terakhir / month-to-date) dengan pergerakan peringkat
+    if {'nama operator', 'spph', 'jam dumping'}.issubset(df_filtered.columns):
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+        section_header("Leaderboard Operator Dump Truck per Periode")
+
+        try:
+            ritase_matrix, operator_labels, mitra_options, _, _ = compute_operator_ritase_matrix(df_selected)
+            cumulative, days = compute_operator_daily_cumsum(df_selected)
+            # Setiap (operator, mitra) hanya punya satu mitra
+            pair_mitra = ritase_matrix.argmax(axis=0)
+
+            with st.form("filter_form_leaderboard"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    window = st.radio("Jendela Waktu", ["Harian", "7 Hari Terakhir", "Month-to-Date"], horizontal=True)
+                with col2:
+                    selected_day = st.selectbox("Sampai Tanggal", list(days.date)[::-1]) if len(days) else None
+                selected_mitra = st.multiselect("Pilih SPPH/Mitra", mitra_options, default=mitra_options, key="mitra_leaderboard")
+                refresh_button = st.form_submit_button("Refresh Data")
+
+            if refresh_button and selected_day is not None:
+                mitra_rows = [mitra_options.index(m) for m in selected_mitra] if selected_mitra else list(range(len(mitra_options)))
+                window_totals = rolling_operator_totals(cumulative, days, window) * np.isin(pair_mitra, mitra_rows)
+
+                # Peringkat per hari akhir (1 = ritase terbanyak); operator tanpa ritase tidak diberi peringkat
+                order = np.argsort(-window_totals, axis=1, kind='stable')
+                ranks = np.empty_like(order)
+                np.put_along_axis(ranks, order, np.arange(1, window_totals.shape[1] + 1)[None, :], axis=1)
+                ranks = np.where(window_totals > 0, ranks, 0)
+
+                d = int(np.searchsorted(days, pd.Timestamp(selected_day)))
+                top_idx, _ = top_bottom_k(window_totals[d], 10)
+                prev_ranks = ranks[d - 1, top_idx] if d > 0 else np.zeros(len(top_idx), dtype=int)
+                perubahan = prev_ranks - ranks[d, top_idx]
+
+                leaderboard_df = pd.DataFrame({
+                    'Peringkat': ranks[d, top_idx],
+                    'operator_mitra': operator_labels[top_idx],
+                    'total_ritase': window_totals[d, top_idx],
+                    'peringkat_sebelumnya': pd.Series(prev_ranks).where(prev_ranks > 0).astype('Int64'),
+                    'pergerakan': np.select(
+                        [prev_ranks == 0, perubahan > 0, perubahan < 0],
+                        ['Baru', np.char.add('▲ ', perubahan.astype(str)), np.char.add('▼ ', (-perubahan).astype(str))],
+                        default='='
+                    )
+                })
+                show_table(leaderboard_df.set_index('Peringkat'))
+
+                # Riwayat peringkat operator Top 10 saat ini di setiap hari akhir
+                rank_history_df = pd.DataFrame(ranks[:d + 1, top_idx], columns=operator_labels[top_idx])
+                rank_history_df['tanggal'] = days[:d + 1]
+                rank_history_df = rank_history_df.melt(id_vars='tanggal', var_name='operator_mitra', value_name='peringkat')
+                rank_history_df = rank_history_df[rank_history_df['peringkat'] > 0]
+
+                fig_leaderboard = px.line(
+                    rank_history_df,
+                    x='tanggal',
+                    y='peringkat',
+                    color='operator_mitra',
+                    markers=True,
+                    title=f'Pergerakan Peringkat Top 10 Operator ({window})',
+                    labels={'peringkat': 'Peringkat', 'tanggal': 'Tanggal Operasional', 'operator_mitra': 'Nama Operator (Mitra)'},
+                    template="plotly_dark"
+                )
+                fig_leaderboard.update_layout(
+                    yaxis=dict(autorange='reversed'),
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(size=15, color="white")
+                )
+                show_chart(fig_leaderboard)
+
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {str(e)}")
+
+    # Top Operator Dump Truck berdasarkan skor jarak ritase
+    if {'nama operator', 'spph', 'loading point', 'dumping point'}.issubset(df_filtered.columns):
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+        section_header("Top Operator Dump Truck Berdasarkan Skor Jarak")
+
+        try:
+            route_codes, loading_points, dumping_points = compute_route_codes(df_selected)
+
+            # Matriks jarak rute bisa diubah langsung di aplikasi dan disimpan di json file local
+            route_distances = load_json(route_distances_file)
+            with st.expander("Matriks Jarak Rute (km)"):
+                routes_df = pd.DataFrame(
+                    [(lp, dp) for lp in df['loading point'].dropna().astype(str).unique() for dp in df['dumping point'].dropna().astype(str).unique()],
+                    columns=['loading point', 'dumping point']
+                )
+                routes_df['jarak_km'] = [route_distances.get(lp, {}).get(dp, 0.0) for lp, dp in zip(routes_df['loading point'], routes_df['dumping point'])]
+                edited_routes_df = st.data_editor(
+                    routes_df,
+                    disabled=['loading point', 'dumping point'],
+                    hide_index=True,
+                    key='route_distance_editor'
+                )
+                for lp, dp, km in edited_routes_df[['loading point', 'dumping point', 'jarak_km']].itertuples(index=False):
+                    route_distances.setdefault(lp, {})[dp] = 0.0 if pd.isna(km) else float(km)
+                save_json(route_distances_file, route_distances)
+
+            _, operator_labels, mitra_options, row_pair_codes, row_mitra_codes = compute_operator_ritase_matrix(df_selected)
+
+            with st.form("filter_form_skor_jarak"):
+                selected_mitra = st.multiselect("Pilih SPPH/Mitra", mitra_options, default=mitra_options, key="mitra_skor_jarak")
+                refresh_button = st.form_submit_button("Refresh Data")
+
+            if refresh_button:
+                jarak_km = lookup_route_distance(route_codes, route_distance_array(route_distances, loading_points, dumping_points))
+                skor = skor_jarak(jarak_km)
+
+                # Skor dan km per (operator, mitra) dipisah per mitra dengan bincount berbobot
+                n_mitra, n_pair = len(mitra_options), len(operator_labels)
+                valid = row_pair_codes >= 0
+                flat_codes = row_mitra_codes[valid] * n_pair + row_pair_codes[valid]
+                skor_matrix = np.bincount(flat_codes, weights=skor[valid], minlength=n_mitra * n_pair).reshape(n_mitra, n_pair)
+                km_matrix = np.bincount(flat_codes, weights=jarak_km[valid], minlength=n_mitra * n_pair).reshape(n_mitra, n_pair)
+                ritase_matrix = np.bincount(flat_codes, minlength=n_mitra * n_pair).reshape(n_mitra, n_pair)
+
+                mitra_rows = [mitra_options.index(m) for m in selected_mitra] if selected_mitra else list(range(n_mitra))
+                total_skor = skor_matrix[mitra_rows].sum(axis=0)
+                total_km = km_matrix[mitra_rows].sum(axis=0)
+                total_ritase = ritase_matrix[mitra_rows].sum(axis=0)
+
+                tanpa_jarak = int((valid & (jarak_km == 0)).sum())
+                if tanpa_jarak:
+                    st.warning(f"Total {tanpa_jarak} ritase memakai rute yang belum memiliki jarak (skor 0). Lengkapi Matriks Jarak Rute.")
+
+                top_idx, _ = top_bottom_k(total_skor, 10)
+                order = np.flatnonzero(total_skor > 0)
+                order = order[np.argsort(-total_skor[order], kind='stable')]
+
+                skor_operator_df = pd.DataFrame({
+                    'operator_mitra': operator_labels[order],
+                    'total_skor': total_skor[order].astype(int),
+                    'total_km': total_km[order].round(2),
+                    'total_ritase': total_ritase[order]
+                })
+                skor_operator_df['No'] = skor_operator_df.index + 1
+
+                top_10_skor = pd.DataFrame({'operator_mitra': operator_labels[top_idx], 'total_skor': total_skor[top_idx].astype(int)})
+                show_chart(plot_ranking(
+                    top_10_skor, 'operator_mitra', 'total_skor', "Top 10 Operator Dump Truck dengan Skor Jarak Tertinggi",
+                    {'total_skor': 'Total Skor Jarak', 'operator_mitra': 'Nama Operator (Mitra)'}
+                ))
+
+                show_table(skor_operator_df[['No', 'operator_mitra', 'total_skor', 'total_km', 'total_ritase']].set_index('No'))
+
+                csv_skor = skor_operator_df[['No', 'operator_mitra', 'total_skor', 'total_km', 'total_ritase']].to_csv(index=False).encode('utf-8')
+                st.download_button(label="Download Tabel Skor Jarak Operator", data=csv_skor, file_name='operator_skor_jarak.csv', mime='text/csv', key='download-skor-jarak')
+
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {str(e)}")
+
+    # Produktivitas Haul (Ton-Km) per dump truck, operator, mitra dan shift
+    if {'dump truck', 'nama operator', 'spph', 'shift', 'loading point', 'dumping point', 'jam dumping'}.issubset(df_filtered.columns):
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+        section_header("Produktivitas Haul (Ton-Km)")
+
+        try:
+            # Cube dibangun dari dataset per rentang tanggal (kode rute/operator ikut dataset yang sama);
+            # pilihan filter sidebar diterapkan saat rollup sehingga mengganti filter tidak membangun ulang cube
+            productivity_cube = compute_productivity_cube(df)
+            route_codes, loading_points, dumping_points = compute_route_codes(df)
+            _, operator_labels, mitra_options, _, _ = compute_operator_ritase_matrix(df)
+            distance_array = route_distance_array(load_json(route_distances_file), loading_points, dumping_points)
+
+            dimension_options = {"Dump Truck": 'dump truck', "Operator": 'operator', "Mitra": 'mitra', "Shift": 'shift'}
+            selected_dimension = st.radio("Produktivitas per", list(dimension_options.keys()), horizontal=True)
+            dimension = dimension_options[selected_dimension]
+
+            productivity_df = rollup_productivity(productivity_cube, dimension, distance_array, sidebar_filters)
+            # Kode integer dikembalikan ke nama operator/mitra untuk tampilan
+            if dimension == 'operator':
+                productivity_df = productivity_df[productivity_df['operator'] >= 0]
+                productivity_df['operator'] = operator_labels[productivity_df['operator'].to_numpy()]
+            elif dimension == 'mitra':
+                productivity_df = productivity_df[productivity_df['mitra'] >= 0]
+                productivity_df['mitra'] = np.asarray(mitra_options, dtype=object)[productivity_df['mitra'].to_numpy()]
+            productivity_df = productivity_df.sort_values('ton_km_per_jam', ascending=False).reset_index(drop=True)
+
+            if productivity_df['total_ton_km'].sum() == 0:
+                st.info("Isi Matriks Jarak Rute (km) pada bagian Skor Jarak agar ton-km dapat dihitung.")
+
+            fig_productivity = px.bar(
+                productivity_df.head(20),
+                x=dimension,
+                y='ton_km_per_jam',
+                hover_data=['total_ton_km', 'total_km_tempuh', 'total_ritase', 'jam_aktif'],
+                title=f'Ton-Km per Jam per {selected_dimension} (20 Tertinggi)',
+                labels={'ton_km_per_jam': 'Ton-Km per Jam', dimension: selected_dimension},
+                template="plotly_dark",
+                color_discrete_sequence=['#00CC96']
+            )
+            fig_productivity.update_layout(
+                xaxis_tickangle=-45,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(size=15, color="white")
+            )
+            show_chart(fig_productivity)
+            show_table(productivity_df)
+
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {str(e)}")
+
+    # Distribusi Payload (tonase per ritase) per dump truck dan mitra
+    if {'dump truck', 'spph', 'tonase'}.issubset(df_filtered.columns):
+        st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+        section_header("Distribusi Payload (Tonase per Ritase)")
+
+        try:
+            # Payload nominal per kelas dump truck bisa diubah langsung di aplikasi dan disimpan di json file local
+            truck_payloads = load_json(truck_payloads_file)
+            with st.expander("Payload Nominal per Kelas Dump Truck (ton)"):
+                kelas_df = pd.DataFrame({'kelas': sorted(truck_class(df['dump truck'].dropna()).unique())})
+                kelas_df['payload_nominal'] = [truck_payloads.get(k, 0.0) for k in kelas_df['kelas']]
+                edited_kelas_df = st.data_editor(
+                    kelas_df,
+                    disabled=['kelas'],
+                    hide_index=True,
+                    key='truck_payload_editor'
+                )
+                for kelas, ton in edited_kelas_df[['kelas', 'payload_nominal']].itertuples(index=False):
+                    truck_payloads[kelas] = 0.0 if pd.isna(ton) else float(ton)
+                save_json(truck_payloads_file, truck_payloads)
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                payload_group_options = {"Dump Truck": 'dump truck', "Mitra": 'spph'}
+                selected_payload_group = st.radio("Distribusi per", list(payload_group_options.keys()), horizontal=True)
+            with col2:
+                batas_underload = st.number_input("Batas Underload (% di bawah nominal)", min_value=0.0, max_value=100.0, value=10.0, step=1.0)
+            with col3:
+                batas_overload = st.number_input("Batas Overload (% di atas nominal)", min_value=0.0, max_value=100.0, value=10.0, step=1.0)
+            group_column = payload_group_options[selected_payload_group]
+
+            edges, counts, payload_stats, row_codes = compute_payload_histograms(
+                df_selected, group_column, max_nominal=max(truck_payloads.values(), default=0)
+            )
+
+            # Flag per ritase terhadap payload nominal kelas truknya (kelas tanpa nominal tidak diberi flag)
+            nominal = truck_class(df_filtered['dump truck']).map(truck_payloads).fillna(0).to_numpy(dtype=float)
+            tonase = df_filtered['tonase'].to_numpy(dtype=float)
+            berflag = (row_codes >= 0) & (nominal > 0)
+            underload = berflag & (tonase < nominal * (1 - batas_underload / 100))
+            overload = berflag & (tonase > nominal * (1 + batas_overload / 100))
+            n_group = len(payload_stats)
+            dinilai = np.bincount(row_codes[berflag], minlength=n_group)
+            payload_stats['underload_persen'] = np.divide(
+                np.bincount(row_codes[underload], minlength=n_group) * 100, dinilai, out=np.zeros(n_group), where=dinilai > 0
+            ).round(2)
+            payload_stats['overload_persen'] = np.divide(
+                np.bincount(row_codes[overload], minlength=n_group) * 100, dinilai, out=np.zeros(n_group), where=dinilai > 0
+            ).round(2)
+            if group_column == 'dump truck':
+                payload_stats.insert(1, 'kelas', truck_class(payload_stats['dump truck']))
+                payload_stats.insert(2, 'payload_nominal', payload_stats['kelas'].map(truck_payloads).fillna(0))
+            if not berflag.any():
+                st.info("Isi Payload Nominal per Kelas Dump Truck agar underload/overload dapat dihitung.")
+
+            selected_payload_entity = st.selectbox(f"Pilih {selected_payload_group}", payload_stats[group_column].tolist(), key="payload_entity")
+            entity_idx = payload_stats.index[payload_stats[group_column] == selected_payload_entity][0]
+            # Bar terakhir = ritase di atas batas histogram (overflow), digambar satu bin setelah edges[-1]
+            bin_width = edges[1] - edges[0]
+            histogram_df = pd.DataFrame({
+                'payload': np.append((edges[:-1] + edges[1:]) / 2, edges[-1] + bin_width / 2),
+                'jumlah_ritase': counts[entity_idx]
+            })
+
+            fig_payload = px.bar(
+                histogram_df,
+                x='payload',
+                y='jumlah_ritase',
+                title=f'Distribusi Payload {selected_payload_entity}',
+                labels={'payload': 'Payload (ton)', 'jumlah_ritase': 'Jumlah Ritase'},
+                template="plotly_dark",
+                color_discrete_sequence=['#00CC96']
+            )
+            # Garis persentil dan batas payload nominal
+            entity_stats = payload_stats.loc[entity_idx]
+            for kolom, warna in [('p10', '#ADD8E6'), ('p50', '#ffb31a'), ('p90', '#ADD8E6')]:
+                if pd.notna(entity_stats[kolom]):
+                    fig_payload.add_vline(x=entity_stats[kolom], line_dash='dot', line_color=warna, annotation_text=kolom.upper())
+            if group_column == 'dump truck' and entity_stats['payload_nominal'] > 0:
+                fig_payload.add_vline(x=entity_stats['payload_nominal'], line_color='red', annotation_text='Nominal')
+            if counts[entity_idx, -1] > 0:
+                fig_payload.add_annotation(
+                    x=histogram_df['payload'].iloc[-1], y=counts[entity_idx, -1], yshift=15, showarrow=False,
+                    text=f"≥ {edges[-1]:g} t (maks {entity_stats['maks_payload']:,.2f})"
+                )
+            fig_payload.update_layout(
+                bargap=0.05,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(size=15, color="white")
+            )
+            show_chart(fig_payload)
+
+            show_table(payload_stats.sort_values('underload_persen', ascending=False).reset_index(drop=True))
+
+        except Exception as e:
+            st.error(f"Terjadi kesalahan: {str(e)}")
+
+    # Laporan Excel (Rakor, SPPH/Mitra, Jam Dumping, Top Operator dan data mentah opsional)
+    st.markdown("<hr style='border: 1px solid red;' />", unsafe_allow_html=True)
+    close_perf_section()
+    st.subheader("Laporan Excel")
+
+    # Pilihan form Jam Dumping/Top Operator dibaca di sini; tabel baru dihitung saat tombol diklik
+    report_jam_dumping_selection = st.session_state.get('jam_dumping_selection')
+    report_operator_mitra = st.session_state.get('top_operator_selection', [])
+    include_raw_data = st.checkbox("Sertakan data mentah (hasil filter)", value=False)
+
+    # Data hasil filter disusun ulang saat tombol diklik dari dataset lengkap + pilihan filter sidebar + target
+    load_filtered = partial(
+        rebuild_filtered, load_full_dataset, date1, date2, sidebar_filters,
+        (new_rakor_targets, new_spph_mitra_targets, num_days_rakor)
+    )
+
+    # Callable dijalankan Streamlit di thread terpisah saat tombol diklik, sehingga UI tidak tertahan
+    st.download_button(
+        "Download Laporan Excel",
+        data=perf_download("unduh: laporan Excel", partial(
+            build_dashboard_report, build_excel_report, load_filtered, {'Rakor': rakor_df, 'SPPH Mitra': spph_mitra_df},
+            report_jam_dumping_selection, report_operator_mitra, include_raw_data
+        )),
+        file_name="laporan_rehandling_batubara.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore"
+    )
+
+    # Snapshot HTML statis berisi semua grafik dan tabel utama yang sedang tampil (data agregat saja)
+    include_plotlyjs = st.checkbox("Sertakan Plotly JS di snapshot (bisa dibuka offline, sekitar +5 MB)", value=True)
+    st.download_button(
+        "Download Snapshot HTML",
+        data=perf_download("unduh: snapshot HTML", partial(
+            build_html_snapshot, "Rehandling Batubara Dashboard", image_base64, snapshot_items,
+            subtitle=f"{filename} | {date1:%d-%m-%Y} s/d {date2:%d-%m-%Y}", include_plotlyjs=include_plotlyjs
+        )),
+        file_name="rehandling_batubara_snapshot.html",
+        mime="text/html",
+        on_click="ignore"
+    )
 
-    csv_full = df.to_csv(index=False).encode('utf-8')
-    st.download_button('Download Full Dataset', data=csv_full, file_name="rehandling_batubara_data.csv", mime='text/csv')
+    # Download options (berkas baru dibuat saat tombol diklik)
+    download_formats = {
+        "CSV": ('csv', 'text/csv'),
+        "CSV (gzip)": ('csv.gz', 'application/gzip'),
+        "Parquet": ('parquet', 'application/vnd.apache.parquet')
+    }
+    selected_format = st.radio("Format Unduhan", list(download_formats.keys()), horizontal=True, key="download_format")
+    file_format, mime = download_formats[selected_format]
+
+    st.download_button(
+        "Download Target Rakor Comparison Data",
+        data=perf_download(f"unduh: rakor {file_format}", partial(export_dataset, rakor_df, file_format)),
+        file_name=f"Target_rakor_comparison_data.{file_format}",
+        mime=mime,
+        on_click="ignore"
+    )
+    st.download_button(
+        'Download Full Dataset',
+        data=perf_download(f"unduh: dataset {file_format}", partial(
+            export_filtered, export_dataset, partial(rebuild_filtered, load_full_dataset, date1, date2), file_format
+        )),
+        file_name=f"rehandling_batubara_data.{file_format}",
+        mime=mime,
+        on_click="ignore"
+    )
     
     
+
+    # Panel debug performa: tahap pada rerun ini, ringkasan riwayat sesi, dan unduhan CSV
+    if perf_debug:
+        with st.expander("Debug Performa", expanded=True):
+            perf_df = pd.DataFrame(list(perf_history))
+            if perf_df.empty:
+                st.info("Belum ada catatan performa.")
+            else:
+                st.caption("mem_delta_mb = perubahan RSS proses selama tahap; payload_kb = ukuran JSON grafik, memori tabel atau berkas unduhan")
+                st.write(f"Rerun ke-{perf_run}: total {perf_df.loc[perf_df['run'] == perf_run, 'wall_ms'].sum():,.1f} ms")
+                st.dataframe(perf_df[perf_df['run'] == perf_run], use_container_width=True, hide_index=True)
+
+                st.write("Ringkasan riwayat sesi per tahap:")
+                perf_summary = perf_df.groupby('stage', sort=False)['wall_ms'].agg(
+                    jumlah='count', rata_rata_ms='mean', p95_ms=lambda x: x.quantile(0.95), maks_ms='max'
+                ).round(1).reset_index()
+                st.dataframe(perf_summary, use_container_width=True, hide_index=True)
+
+                st.download_button(
+                    "Download Riwayat Performa (CSV)",
+                    data=perf_df.to_csv(index=False).encode('utf-8'),
+                    file_name="riwayat_performa_dashboard.csv",
+                    mime="text/csv"
+                )
+            if shared_cache_mb > 0:
+                shared_stats = shared_dataset_cache(shared_cache_mb).stats()
+                st.write(f"Dataset bersama di proses ini: {len(shared_stats)} dataset, "
+                         f"{sum(d['memori_mb'] for d in shared_stats):,.1f} / {shared_cache_mb:,} MB")
+                st.dataframe(pd.DataFrame(shared_stats), use_container_width=True, hide_index=True)
+            if st.button("Reset Riwayat Performa"):
+                perf_history.clear()
@@ -0,0 +1,154 @@
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+
+import rehandling_core as core
+from generate_ritase import generate_ritase
+
+# Benchmark tiap tahap dashboard di atas data sintetis (10k / 100k / 1M baris secara default).
+# Mencatat waktu (wall time), memori puncak (tracemalloc), selisih RSS dan selisih alokasi Arrow per tahap
+# agar regresi kecepatan dan memori terlihat. Contoh:
+#   python benchmark_dashboard.py --sizes 10000 100000 --output hasil_benchmark.csv
+#   python benchmark_dashboard.py --cold-start 5
+
+# Target first paint: rerun pertama tampilan "upload file" di proses server baru (streamlit sudah ter-import)
+COLD_START_TARGET_MS = 400
+COLD_START_SCRIPT = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+start = time.perf_counter()
+at.run()
+print((time.perf_counter() - start) * 1000, len(at.exception))
+"""
+
+class StageTimer:
+    def __init__(self, size):
+        self.size = size
+        self.results = []
+
+    # Jalankan satu tahap; memori puncak diukur dengan tracemalloc (numpy/pandas ikut tercatat).
+    # Buffer string Arrow dialokasikan di luar tracemalloc, jadi selisih RSS dan selisih
+    # pyarrow.total_allocated_bytes() (memori yang masih dipegang setelah tahap) ikut dicatat.
+    def run(self, stage, func, *args):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        rss_before, arrow_before = core.current_rss_mb(), pa.total_allocated_bytes()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        rss_delta = core.current_rss_mb() - rss_before
+        arrow_delta = (pa.total_allocated_bytes() - arrow_before) / 2**20
+        self.results.append({
+            'rows': self.size,
+            'stage': stage,
+            'wall_ms': round(elapsed * 1000, 1),
+            'peak_mb': round((peak - before) / 2**20, 1),
+            'rss_delta_mb': round(rss_delta, 1),
+            'arrow_delta_mb': round(arrow_delta, 1)
+        })
+        print(
+            f"{self.size:>9} {stage:<34} {elapsed * 1000:>10.1f} ms {(peak - before) / 2**20:>9.1f} MB"
+            f" RSS {rss_delta:>+8.1f} MB Arrow {arrow_delta:>+8.1f} MB"
+        )
+        return result
+
+def jam_dumping_figure(jam_dumping_df, period_column):
+    return px.line(jam_dumping_df, x='hour', y='total_tonase', color=period_column, template="plotly_dark")
+
+def benchmark_size(size, file_format, days, seed):
+    timer = StageTimer(size)
+    df = generate_ritase(rows=size, days=days, seed=seed)
+    buffer = io.BytesIO()
+    # Workbook ditulis ke memori; xlsx 1 juta baris butuh beberapa menit, csv jauh lebih cepat
+    if file_format == 'csv':
+        df.to_csv(buffer, index=False)
+    else:
+        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+            df.to_excel(writer, sheet_name='Ritase 1', index=False)
+    del df
+
+    buffer.seek(0)
+    df = timer.run('ingest: baca workbook', core.read_workbook, buffer, f"ritase.{file_format}")
+    df = timer.run('ingest: jam/shift/alias', core.prepare_dataset, df, [6 * 60, 18 * 60], {})
+
+    date_start, date_end = core.date_bounds(df)
+    # Rentang penuh hanya berbagi data (tanpa menyalin), jadi yang diukur rentang sebagian: paruh kedua periode.
+    # Tahap berikutnya tetap memakai seluruh data agar jumlah baris antar versi sebanding.
+    timer.run('filter tanggal (paruh kedua)', core.filter_by_date, df, date_start + (date_end - date_start) / 2, date_end)
+    df = core.filter_by_date(df, date_start, date_end)
+    trucks = df['dump truck'].unique()[: max(1, df['dump truck'].nunique() // 2)].tolist()
+    df_filtered = timer.run('filter sidebar', core.filter_dataset, df, date_start, date_end, {'dump truck': trucks})
+
+    rakor_targets = {status: core.get_value_by_status(df, status) for status in core.RAKOR_STATUSES}
+    spph_targets = {spph: 10000.0 for spph in df['spph'].unique()}
+    num_days = (date_end - date_start).days + 1
+    df_filtered = timer.run('target rakor/SPPH', core.assign_targets, df_filtered, rakor_targets, spph_targets, num_days)
+    days_in_month = core.days_in_current_month()
+    timer.run('tabel Rakor', core.build_rakor_table, df_filtered, days_in_month)
+    timer.run('tabel SPPH/Mitra', core.build_spph_mitra_table, df_filtered, days_in_month)
+
+    jam_dumping_sets, _ = timer.run(
+        'jam dumping: semua periode', core.compute_jam_dumping_sets,
+        df_filtered, df_filtered['spph'].unique().tolist(), "Semua Dump Truck", "Semua Lokasi",
+        df_filtered['tanggal_operasional'].min(), df_filtered['tanggal_operasional'].max()
+    )
+    for period, period_column in [("Harian", 'day'), ("Mingguan", 'week'), ("Bulanan", 'month'), ("Total Semua Hari", None)]:
+        timer.run(f'jam dumping: grafik {period}', jam_dumping_figure, jam_dumping_sets[period], period_column)
+
+    ritase_matrix, operator_labels, _, _, _ = timer.run('top operator: matriks', core.compute_operator_ritase_matrix, df_filtered)
+    timer.run('top operator: peringkat', core.rank_operators, ritase_matrix.sum(axis=0), operator_labels)
+    return timer.results
+
+# Setiap ulangan di interpreter baru agar import modul ikut terukur seperti saat server baru start
+def measure_cold_start(repeats, script='1fix.py'):
+    script = os.path.abspath(script)
+    results = []
+    for i in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_SCRIPT, script], cwd=os.path.dirname(script),
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        wall_ms, exceptions = float(output[0]), int(output[1])
+        if exceptions:
+            raise RuntimeError(f"{script} gagal dijalankan pada tampilan awal")
+        results.append({'rows': 0, 'stage': 'first paint (tanpa upload)', 'wall_ms': round(wall_ms, 1), 'peak_mb': None})
+        print(f"cold start {i + 1}: {wall_ms:.1f} ms")
+    median_ms = pd.Series([r['wall_ms'] for r in results]).median()
+    status = "OK" if median_ms <= COLD_START_TARGET_MS else "MELEBIHI TARGET"
+    print(f"Median first paint {median_ms:.1f} ms (target {COLD_START_TARGET_MS} ms): {status}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tahap-tahap dashboard rehandling batubara")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000, 1000000])
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv', help="Format workbook yang di-ingest")
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cold-start', type=int, default=0, metavar='N', help="Ukur first paint dashboard N kali")
+    parser.add_argument('--output', help="Simpan hasil ke CSV (untuk dibandingkan antar versi)")
+    args = parser.parse_args()
+
+    results = measure_cold_start(args.cold_start) if args.cold_start else []
+    tracemalloc.start()
+    for size in args.sizes:
+        results += benchmark_size(size, args.format, args.days, args.seed)
+    tracemalloc.stop()
+
+    results_df = pd.DataFrame(results)
+    print(results_df.groupby('rows')[['wall_ms']].sum().rename(columns={'wall_ms': 'total_ms'}))
+    if args.output:
+        results_df.to_csv(args.output, index=False)
+        print(f"Hasil disimpan ke {args.output}")
+
+if __name__ == '__main__':
+    main()
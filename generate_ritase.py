@@ -0,0 +1,106 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Generator data ritase sintetis dengan skema yang sama seperti file upload dashboard.
+# Setiap dump truck punya satu mitra dan satu operator per shift, ritase berurutan dengan waktu siklus acak,
+# excavator terikat ke loading point dan payload mengikuti kelas truk. Contoh:
+#   python generate_ritase.py --rows 100000 --days 31 --sheets 2 --output ritase_100k.xlsx
+
+MITRA = ['BAK', 'RDP', 'SGJ1', 'SGJ2', 'SGJ3', 'SPARE']
+TRUCK_CLASSES = {'DT': 30.0, 'HD': 40.0}
+LOADING_POINTS = {'LP 1': 'Blok Barat', 'LP 2': 'Blok Barat', 'LP 3': 'Blok Timur', 'LP 4': 'Blok Timur'}
+DUMPING_POINTS = ['DP 1', 'DP 2', 'DP 3']
+SHIFT_STARTS = [6 * 60, 18 * 60]
+
+def generate_ritase(rows=10000, days=31, trucks=60, operators=None, mitra=None, start_date='2024-10-01', seed=0):
+    rng = np.random.default_rng(seed)
+    mitra = np.asarray(mitra or MITRA, dtype=object)
+    operators = operators or trucks * len(SHIFT_STARTS)
+
+    # Atribut tetap per dump truck: kelas (payload nominal), mitra, loading point asal
+    truck_class = np.where(np.arange(trucks) % 4 == 3, 'HD', 'DT')
+    truck_names = np.array([f"{c}-{i + 1:02d}" for i, c in enumerate(truck_class)], dtype=object)
+    truck_payload = np.array([TRUCK_CLASSES[c] for c in truck_class])
+    truck_mitra = mitra[rng.integers(0, len(mitra), trucks)]
+    loading_points = np.array(list(LOADING_POINTS), dtype=object)
+    truck_lp = rng.integers(0, len(loading_points), trucks)
+
+    # Baris dibagi rata ke (hari, truk, shift); ritase dalam satu slot berurutan dengan waktu siklus gamma (~25 menit)
+    n_shift = len(SHIFT_STARTS)
+    slot = rng.integers(0, days * trucks * n_shift, rows)
+    slot.sort()
+    day, rest = np.divmod(slot, trucks * n_shift)
+    truck, shift = np.divmod(rest, n_shift)
+    urutan = pd.Series(slot).groupby(slot).cumcount().to_numpy()
+    siklus = rng.gamma(shape=9.0, scale=25.0 / 9.0, size=rows)
+    menit_ke = pd.Series(siklus).groupby(slot).cumsum().to_numpy() + rng.uniform(0, 20, rows)
+    # Slot yang terlalu padat dipadatkan agar tetap di dalam 12 jam shift
+    n_slot = np.bincount(slot)[slot]
+    menit_ke = np.where(n_slot * 25 > 11 * 60, (urutan + rng.uniform(0, 1, rows)) * (11 * 60 / n_slot), menit_ke)
+    menit = (np.asarray(SHIFT_STARTS)[shift] + menit_ke.astype(np.int64)) % (24 * 60)
+    # Dumping setelah tengah malam pada shift malam tercatat di tanggal kalender berikutnya
+    tanggal = pd.Timestamp(start_date) + pd.to_timedelta(day + (np.asarray(SHIFT_STARTS)[shift] + menit_ke >= 24 * 60), unit='D')
+    detik = rng.integers(0, 60, rows)
+
+    lp = truck_lp[truck]
+    # Sebagian kecil ritase pindah loading point (mis. ganti front)
+    pindah = rng.random(rows) < 0.1
+    lp = np.where(pindah, rng.integers(0, len(loading_points), rows), lp)
+    exca = np.array([f"EX-{i + 1}" for i in range(len(loading_points) * 2)], dtype=object)[lp * 2 + (day % 2)]
+    status = np.where(
+        np.asarray([LOADING_POINTS[p] for p in loading_points])[lp] == 'Blok Barat',
+        np.where(rng.random(rows) < 0.3, 'Rehandling Antar Stock Blok Barat', 'Rehandling Blok Barat'),
+        np.where(rng.random(rows) < 0.3, 'Rehandling Antar Stock Blok Timur', 'Rehandling Blok Timur')
+    ).astype(object)
+    khusus = rng.random(rows)
+    status[khusus < 0.15] = 'FOB MV'
+    status[(khusus >= 0.15) & (khusus < 0.2)] = 'Rehandling Pengiriman Konsumen'
+    status[(khusus >= 0.2) & (khusus < 0.23)] = 'Housekeeping'
+
+    operator = (truck * n_shift + shift) % operators
+    return pd.DataFrame({
+        'Date': tanggal.normalize(),
+        'Shift': np.array([f"Shift {i + 1}" for i in range(n_shift)], dtype=object)[shift],
+        'Dump Truck': truck_names[truck],
+        'Exca': exca,
+        'Loading Point': loading_points[lp],
+        'Dumping Point': np.asarray(DUMPING_POINTS, dtype=object)[rng.integers(0, len(DUMPING_POINTS), rows)],
+        'Status': status,
+        'SPPH': truck_mitra[truck],
+        'Tonase': np.clip(rng.normal(truck_payload[truck], truck_payload[truck] * 0.08), 0, None).round(2),
+        'Jam Dumping': [f"{m // 60:02d}:{m % 60:02d}:{s:02d}" for m, s in zip(menit.tolist(), detik.tolist())],
+        'Nama Operator': np.array([f"Operator {i + 1}" for i in range(operators)], dtype=object)[operator],
+        'Lokasi': np.asarray([LOADING_POINTS[p] for p in loading_points], dtype=object)[lp]
+    })
+
+# Simpan sebagai csv, atau xlsx dengan beberapa sheet (dashboard membaca dan menggabungkan semua sheet)
+def write_workbook(df, path, sheets=1):
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+        return
+    per_sheet = -(-len(df) // sheets)
+    with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+        for i in range(sheets):
+            df.iloc[i * per_sheet:(i + 1) * per_sheet].to_excel(writer, sheet_name=f"Ritase {i + 1}", index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator data ritase sintetis")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--trucks', type=int, default=60)
+    parser.add_argument('--operators', type=int, default=None, help="Default jumlah truk x jumlah shift")
+    parser.add_argument('--mitra', nargs='*', default=MITRA)
+    parser.add_argument('--sheets', type=int, default=1)
+    parser.add_argument('--start-date', default='2024-10-01')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='ritase_sintetis.xlsx', help="Nama file .xlsx atau .csv")
+    args = parser.parse_args()
+
+    df = generate_ritase(args.rows, args.days, args.trucks, args.operators, args.mitra, args.start_date, args.seed)
+    write_workbook(df, args.output, args.sheets)
+    print(f"{len(df)} baris ditulis ke {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import argparse
+import io
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.logger import set_log_level
+from streamlit.runtime.runtime import Runtime
+from streamlit.runtime.scriptrunner import magic
+from streamlit.testing.v1 import AppTest, app_test
+from streamlit.testing.v1.util import patch_config_options
+
+from generate_ritase import generate_ritase
+
+# Load test dashboard: N sesi simulasi dijalankan bersamaan di satu proses (seperti server Streamlit,
+# setiap sesi satu thread). Tiap sesi meng-upload data sintetis, memilih filter, menekan semua tombol
+# Refresh Data lalu membuat semua unduhan. Dilaporkan persentil latensi per rerun, CPU, RSS dan error
+# (st.exception maupun st.error) per bagian dashboard. Contoh:
+#   python loadtest_dashboard.py --users 1 5 10 20 --rows 100000 --output hasil_loadtest.csv
+
+class UploadedWorkbook(io.BytesIO):
+    # Pengganti UploadedFile Streamlit (AppTest belum bisa mengisi st.file_uploader)
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.file_id = f"loadtest-{name}"
+
+def current_rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+# Catat RSS puncak selama satu tingkat beban (dicek tiap 50 ms)
+class RssSampler(threading.Thread):
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_mb = current_rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return max(self.peak_mb, current_rss_mb())
+
+# AppTest dibuat untuk satu sesi per proses: tiap run mem-patch config.get_option secara global, memasang
+# lalu mengosongkan Runtime._instance, dan mem-parse script sendiri (ast.parse di Python 3.11 tidak
+# thread-safe). Selama load test opsi appTest dipasang sekali, sesi yang masih berjalan tetap memakai
+# runtime terakhir, dan parse script dijalankan bergantian (di server sungguhan hanya di-compile sekali).
+@contextmanager
+def concurrent_apptest():
+    compile_lock = threading.Lock()
+    add_magic = magic.add_magic
+    last_runtime = []
+
+    def locked_add_magic(*args, **kwargs):
+        with compile_lock:
+            return add_magic(*args, **kwargs)
+
+    def runtime_instance(cls):
+        if cls._instance is not None:
+            last_runtime[:] = [cls._instance]
+        return cls._instance or last_runtime[0]
+
+    with patch_config_options({"global.appTest": True}), \
+            mock.patch.object(app_test, 'patch_config_options', lambda overrides: nullcontext()), \
+            mock.patch.object(magic, 'add_magic', locked_add_magic), \
+            mock.patch.object(Runtime, 'instance', classmethod(runtime_instance)), \
+            mock.patch.object(Runtime, 'exists', classmethod(lambda cls: cls._instance is not None or bool(last_runtime))):
+        yield
+
+# Unduhan dibuat lazy oleh dashboard; callable-nya disimpan di session_state agar bisa dipanggil
+# seperti saat tombol diklik (Streamlit menjalankannya di luar rerun)
+def capture_download_button(download_button):
+    def wrapper(label, data=None, *args, **kwargs):
+        if callable(data):
+            st.session_state.setdefault('_loadtest_downloads', {})[label] = data
+        return download_button(label, data, *args, **kwargs)
+    return wrapper
+
+# Kesalahan di halaman: st.exception (error tak tertangani) dan st.error (bagian yang menangkap error lalu
+# menampilkan "Terjadi kesalahan"), masing-masing dengan judul bagian (subheader) terakhir sebelum elemennya
+def page_errors(at):
+    errors = []
+    for root, section in [(at.sidebar, 'Sidebar'), (at.main, 'Awal halaman')]:
+        for node in root:
+            if node.type == 'subheader':
+                section = node.value
+            elif node.type in ('error', 'exception'):
+                errors.append((section, str(node.value)))
+    return errors
+
+def run_session(user, script, timeout, think_time, records):
+    def timed(step, action):
+        start = time.perf_counter()
+        at = action()
+        wall_ms = (time.perf_counter() - start) * 1000
+        errors = page_errors(at)
+        records.append({
+            'user': user,
+            'step': step,
+            'latency_ms': wall_ms,
+            'error': "; ".join(f"{section}: {message}" for section, message in errors) or None,
+            'bagian_error': ", ".join(dict.fromkeys(section for section, _ in errors)) or None
+        })
+        time.sleep(think_time)
+        return at
+
+    at = AppTest.from_file(script, default_timeout=timeout)
+    at = timed('upload', at.run)
+
+    # Filter sidebar: pilih shift pertama lalu dump truck pertama
+    for label in ["Select Shift", "Select Dump Truck"]:
+        widgets = [w for w in at.sidebar.multiselect if w.label == label]
+        if widgets and widgets[0].options:
+            at = timed(f'filter {label}', widgets[0].select(widgets[0].options[0]).run)
+
+    # Semua tombol Refresh Data (form per bagian), urut dari atas
+    i = 0
+    while i < len(buttons := [b for b in at.button if b.label == "Refresh Data"]):
+        at = timed(f'refresh {i + 1}', buttons[i].click().run)
+        i += 1
+
+    for label, build in at.session_state['_loadtest_downloads'].items() if '_loadtest_downloads' in at.session_state else []:
+        start = time.perf_counter()
+        try:
+            build()
+            error = None
+        except Exception as e:
+            error = str(e)
+        records.append({
+            'user': user,
+            'step': f'unduh {label}',
+            'latency_ms': (time.perf_counter() - start) * 1000,
+            'error': error,
+            'bagian_error': f'unduh {label}' if error else None
+        })
+
+def run_level(users, script, timeout, think_time, warm):
+    if not warm:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+    records = []
+    sampler = RssSampler()
+    rss_start = current_rss_mb()
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    sampler.start()
+    start = time.perf_counter()
+
+    threads = [threading.Thread(target=run_session, args=(i, script, timeout, think_time, records)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wall_s = time.perf_counter() - start
+    usage_end = resource.getrusage(resource.RUSAGE_SELF)
+    rss_peak = sampler.stop()
+    cpu_s = (usage_end.ru_utime - usage_start.ru_utime) + (usage_end.ru_stime - usage_start.ru_stime)
+
+    records_df = pd.DataFrame(records).assign(users=users)
+    reruns = records_df[~records_df['step'].str.startswith('unduh')]
+    latency = reruns['latency_ms'].to_numpy()
+    summary = {
+        'users': users,
+        'reruns': len(reruns),
+        'errors': int(records_df['error'].notna().sum()),
+        'p50_ms': np.percentile(latency, 50),
+        'p90_ms': np.percentile(latency, 90),
+        'p95_ms': np.percentile(latency, 95),
+        'p99_ms': np.percentile(latency, 99),
+        'max_ms': latency.max(),
+        'rerun_per_s': len(reruns) / wall_s,
+        'unduh_p95_ms': records_df.loc[records_df['step'].str.startswith('unduh'), 'latency_ms'].quantile(0.95),
+        'cpu_core': cpu_s / wall_s,
+        'rss_awal_mb': rss_start,
+        'rss_puncak_mb': rss_peak,
+        'wall_s': wall_s
+    }
+    return summary, records_df
+
+# Jumlah aksi yang gagal per bagian dashboard (satu aksi bisa gagal di beberapa bagian)
+def errors_per_section(records_df):
+    return records_df['bagian_error'].dropna().str.split(', ').explode().value_counts()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test dashboard rehandling batubara dengan N sesi AppTest")
+    parser.add_argument('--users', type=int, nargs='*', default=[1, 2, 5, 10], help="Jumlah sesi bersamaan per tingkat")
+    parser.add_argument('--rows', type=int, default=10000, help="Jumlah baris data sintetis yang di-upload")
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--script', default='1fix.py')
+    parser.add_argument('--think-time', type=float, default=0.0, help="Jeda antar aksi per sesi (detik)")
+    parser.add_argument('--timeout', type=float, default=600, help="Batas waktu satu rerun (detik)")
+    parser.add_argument('--warm', action='store_true', help="Jangan kosongkan cache Streamlit antar tingkat")
+    parser.add_argument('--output', help="Simpan ringkasan per tingkat ke CSV")
+    parser.add_argument('--raw-output', help="Simpan latensi tiap aksi ke CSV")
+    args = parser.parse_args()
+
+    df = generate_ritase(rows=args.rows, days=args.days)
+    buffer = io.BytesIO()
+    if args.format == 'csv':
+        df.to_csv(buffer, index=False)
+    else:
+        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+            df.to_excel(writer, sheet_name='Ritase 1', index=False)
+    workbook = buffer.getvalue()
+    filename = f"ritase_loadtest.{args.format}"
+
+    # Log konversi Arrow dari st.dataframe (per rerun, per sesi) tidak perlu ikut tercetak
+    # (config dibaca dulu, karena pembacaan config memasang ulang logger.level)
+    st.get_option('logger.level')
+    set_log_level('error')
+
+    # File json (target, kalender shift) ditulis di folder kerja dashboard, sama seperti di server
+    script = os.path.abspath(args.script)
+    os.chdir(os.path.dirname(script))
+
+    summaries, raw = [], []
+    with concurrent_apptest(), \
+            mock.patch.object(st, 'file_uploader', lambda *a, **k: UploadedWorkbook(workbook, filename)), \
+            mock.patch.object(st, 'download_button', capture_download_button(st.download_button)):
+        for users in args.users:
+            summary, records_df = run_level(users, script, args.timeout, args.think_time, args.warm)
+            summaries.append(summary)
+            raw.append(records_df)
+            print(
+                f"{users:>3} sesi: p50 {summary['p50_ms']:>8.1f} ms  p95 {summary['p95_ms']:>8.1f} ms  "
+                f"p99 {summary['p99_ms']:>8.1f} ms  {summary['rerun_per_s']:>5.2f} rerun/s  "
+                f"CPU {summary['cpu_core']:.2f} core  RSS {summary['rss_puncak_mb']:,.0f} MB  error {summary['errors']}"
+            )
+            for section, count in errors_per_section(records_df).items():
+                print(f"      error di {section}: {count} aksi")
+
+    summary_df = pd.DataFrame(summaries).round(1)
+    print(summary_df.to_string(index=False))
+    if args.output:
+        summary_df.to_csv(args.output, index=False)
+        print(f"Ringkasan disimpan ke {args.output}")
+    if args.raw_output:
+        pd.concat(raw, ignore_index=True).to_csv(args.raw_output, index=False)
+        print(f"Latensi per aksi disimpan ke {args.raw_output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import rehandling_core as core
+
+# API lokal (tanpa layanan eksternal) untuk agregat dashboard: achievement rakor dan SPPH/Mitra,
+# profil jam dumping dan peringkat operator. Dataset di-ingest sekali (DatasetCache, di-load ulang bila
+# file berubah). Respons JSON atau Arrow dengan ETag, sehingga polling tanpa perubahan dijawab 304 tanpa
+# menghitung ulang. Contoh:
+#   python rehandling_api.py data.xlsx --port 8600
+#   curl "http://127.0.0.1:8600/api/rakor?start=2024-10-01&end=2024-10-31&shift=Shift%201"
+#   curl "http://127.0.0.1:8600/api/jam-dumping?period=Harian&mitra=SGJTotal&format=arrow" -o jam_dumping.arrows
+#   curl "http://127.0.0.1:8600/api/operator-ranking?mitra=SGJ" -H 'If-None-Match: "<etag sebelumnya>"'
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+CONFIG_FILES = ['rakor_targets.json', 'spph_mitra_targets.json', 'shift_calendar.json', 'operator_aliases.json']
+# Parameter filter sidebar (boleh diulang, mis. ?shift=Shift%201&shift=Shift%202)
+FILTER_PARAMS = {column.replace(' ', '_'): column for column in core.FILTER_COLUMNS}
+JAM_DUMPING_PERIODS = ["Harian", "Mingguan", "Bulanan", "Total Semua Hari"]
+
+def endpoint_rakor(df, params):
+    return core.build_rakor_table(df, core.days_in_current_month())
+
+def endpoint_spph_mitra(df, params):
+    return core.build_spph_mitra_table(df, core.days_in_current_month())
+
+def endpoint_jam_dumping(df, params):
+    period = params.get('period', ["Total Semua Hari"])[0]
+    if period not in JAM_DUMPING_PERIODS:
+        raise ValueError(f"period harus salah satu dari {JAM_DUMPING_PERIODS}")
+    # Lokasi opsional seperti di dashboard; kolom baru dibutuhkan bila parameter lokasi dikirim
+    lokasi = params.get('lokasi', ["Semua Lokasi"])[0]
+    if lokasi != "Semua Lokasi" and 'lokasi' not in df.columns:
+        raise ValueError("Kolom ['lokasi'] tidak ada di workbook")
+    # Pilihan mitra sama seperti dashboard (SGJTotal = SGJ1 + SGJ2 + SGJ3 + SPARE), kosong berarti semua
+    jam_dumping_sets, _ = core.compute_jam_dumping_sets(
+        df, params.get('mitra') or df['spph'].unique().tolist(), "Semua Dump Truck",
+        lokasi, df['tanggal_operasional'].min(), df['tanggal_operasional'].max()
+    )
+    return jam_dumping_sets[period]
+
+def endpoint_operator_ranking(df, params):
+    ritase_matrix, operator_labels, mitra_options, _, _ = core.compute_operator_ritase_matrix(df)
+    # Mitra SGJ1-SGJ3 dan SPARE digabung menjadi SGJ, sama seperti Top Operator di dashboard
+    mitra_rows = [mitra_options.index(m) for m in params.get('mitra', []) if m in mitra_options] or list(range(len(mitra_options)))
+    operator_ritase_df, _, _, _ = core.rank_operators(ritase_matrix[mitra_rows].sum(axis=0), operator_labels)
+    return operator_ritase_df[['No', 'operator_mitra', 'total_ritase', 'Kategori']]
+
+# path: (fungsi, kolom yang dibutuhkan)
+ENDPOINTS = {
+    '/api/rakor': (endpoint_rakor, {'status', 'spph'}),
+    '/api/spph-mitra': (endpoint_spph_mitra, {'status', 'spph'}),
+    '/api/jam-dumping': (endpoint_jam_dumping, {'jam dumping', 'spph'}),
+    '/api/operator-ranking': (endpoint_operator_ranking, {'nama operator', 'spph'})
+}
+
+def to_json(table):
+    return table.to_json(orient='records', date_format='iso', double_precision=2).encode('utf-8')
+
+def to_arrow(table):
+    import pyarrow as pa
+
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue()
+
+class AggregateService:
+    def __init__(self, workbook, config_dir, cache_mb, response_entries):
+        self.workbook = workbook
+        self.config_dir = config_dir
+        self.datasets = core.DatasetCache(cache_mb * 2**20)
+        self.response_entries = response_entries
+        self._responses = OrderedDict()
+        self._file_state = (None, None)
+        self._lock = threading.Lock()
+
+    def config(self, name):
+        return core.load_json(os.path.join(self.config_dir, name))
+
+    # Hash isi workbook dihitung ulang hanya bila ukuran/waktu modifikasi file berubah
+    def workbook_hash(self):
+        stat = os.stat(self.workbook)
+        with self._lock:
+            if self._file_state[0] != (stat.st_mtime_ns, stat.st_size):
+                with open(self.workbook, 'rb') as f:
+                    self._file_state = ((stat.st_mtime_ns, stat.st_size), core.content_hash(f.read()))
+            return self._file_state[1]
+
+    def dataset(self, key, shift_starts, operator_aliases):
+        def load():
+            with open(self.workbook, 'rb') as f:
+                df = core.read_workbook(f, os.path.basename(self.workbook))
+            return core.prepare_dataset(df, shift_starts, operator_aliases)
+        return self.datasets.get_or_load(key, load)
+
+    # ETag dihitung dari hash dataset, isi json config, bulan berjalan dan query, sebelum agregat dihitung
+    def respond(self, path, params, file_format, if_none_match):
+        configs = {name: self.config(name) for name in CONFIG_FILES}
+        shift_starts = core.parse_shift_starts(", ".join(configs['shift_calendar.json'].get('shift_starts', ["06:00", "18:00"])))
+        key = core.dataset_key(self.workbook_hash(), self.workbook, shift_starts, configs['operator_aliases.json'])
+        etag = '"' + hashlib.sha256(json.dumps(
+            [key, configs, core.days_in_current_month(), path, sorted(params.items()), file_format], sort_keys=True, default=str
+        ).encode('utf-8')).hexdigest()[:32] + '"'
+        if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return 304, etag, None
+
+        with self._lock:
+            if etag in self._responses:
+                self._responses.move_to_end(etag)
+                return 200, etag, self._responses[etag]
+
+        endpoint, required_columns = ENDPOINTS[path]
+        df = self.dataset(key, shift_starts, configs['operator_aliases.json'])
+        missing = required_columns - set(df.columns)
+        if missing:
+            raise ValueError(f"Kolom {sorted(missing)} tidak ada di workbook")
+        min_date, max_date = core.date_bounds(df)
+        date_start = pd.to_datetime(params['start'][0]) if 'start' in params else min_date
+        date_end = pd.to_datetime(params['end'][0]) if 'end' in params else max_date
+        df = core.filter_dataset(df, date_start, date_end, {column: params.get(name) for name, column in FILTER_PARAMS.items()})
+        df = core.assign_saved_targets(df, configs['rakor_targets.json'], configs['spph_mitra_targets.json'], date_start, date_end)
+        table = endpoint(df, params)
+        body = to_arrow(table) if file_format == 'arrow' else to_json(table)
+
+        with self._lock:
+            self._responses[etag] = body
+            while len(self._responses) > self.response_entries:
+                self._responses.popitem(last=False)
+        return 200, etag, body
+
+def make_handler(service):
+    class ApiHandler(BaseHTTPRequestHandler):
+        def send_body(self, status, body, content_type, etag=None):
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', etag)
+            # Klien wajib validasi ulang dengan If-None-Match; respons tidak berubah dijawab 304 tanpa body
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept')
+            if body is not None:
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body is not None:
+                self.wfile.write(body)
+
+        def send_error_json(self, status, message):
+            self.send_body(status, json.dumps({'error': message}).encode('utf-8'), 'application/json')
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == '/api/health':
+                self.send_body(200, json.dumps({'status': 'ok', 'endpoints': sorted(ENDPOINTS)}).encode('utf-8'), 'application/json')
+                return
+            if url.path not in ENDPOINTS:
+                self.send_error_json(404, f"Endpoint {url.path} tidak dikenal")
+                return
+
+            wants_arrow = params.pop('format', ['json'])[0] == 'arrow' or ARROW_MIME in self.headers.get('Accept', '')
+            file_format = 'arrow' if wants_arrow else 'json'
+            try:
+                status, etag, body = service.respond(url.path, params, file_format, self.headers.get('If-None-Match', ''))
+            except (ValueError, KeyError) as e:
+                self.send_error_json(400, str(e))
+                return
+            except Exception as e:
+                self.send_error_json(500, f"Terjadi kesalahan: {str(e)}")
+                return
+            self.send_body(status, body, ARROW_MIME if wants_arrow else 'application/json', etag)
+
+    return ApiHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="API lokal agregat rehandling batubara (JSON/Arrow dengan ETag)")
+    parser.add_argument('workbook', help="File ritase (.xlsx atau .csv), di-load ulang otomatis bila isinya berubah")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--config-dir', default='.', help="Folder json target, kalender shift dan alias operator")
+    parser.add_argument('--cache-mb', type=int, default=2048, help="Batas memori dataset yang di-cache")
+    parser.add_argument('--response-cache', type=int, default=256, help="Jumlah respons terakhir yang disimpan")
+    args = parser.parse_args()
+
+    service = AggregateService(args.workbook, args.config_dir, args.cache_mb, args.response_cache)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"API berjalan di http://{args.host}:{args.port} (endpoint: {', '.join(sorted(ENDPOINTS))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
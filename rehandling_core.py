@@ -0,0 +1,1165 @@
+import calendar
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Inti perhitungan dashboard rehandling batubara tanpa Streamlit.
+# Dipakai oleh dashboard (1fix.py, dengan st.cache_data) dan laporan CLI (rehandling_report.py).
+
+# Function to load target values from JSON
+def load_json(file_path):
+    if os.path.exists(file_path):
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+# Function to save target values to JSON
+# Ditulis ke file sementara lalu di-rename (atomik), agar sesi lain tidak membaca file yang setengah tertulis
+def save_json(file_path, data):
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(temp_path, file_path)
+
+# Baca workbook ritase (csv atau xlsx semua sheet), nama kolom dirapikan dan kolom 'date' dijadikan datetime
+def read_workbook(source, filename):
+    if filename.endswith('.csv') or filename.endswith('.txt'):
+        df = pd.read_csv(source, encoding="ISO-8859-1")
+    elif filename.endswith('.xlsx') or filename.endswith('.xls'):
+        # Membaca semua sheet dan menggabungkannya
+        df = pd.concat(pd.read_excel(source, sheet_name=None), ignore_index=True)
+    else:
+        raise ValueError("Unsupported file type. Please upload a CSV or Excel file.")
+
+    # Strip spaces and lowercase all column names for consistency
+    df.columns = df.columns.str.strip().str.lower()
+    if 'date' not in df.columns:
+        raise ValueError("Kolom 'Date' tidak ditemukan dalam dataset.")
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+# Gabungkan kolom 'date' dan 'jam dumping' menjadi satu datetime (vectorized, tanpa loop per baris)
+def parse_jam_dumping(df):
+    # Ambil bagian jam saja (Excel kadang menyimpan jam sebagai '1900-01-01 07:15:00')
+    jam = df['jam dumping'].astype(str).str.strip().str.split(' ').str[-1]
+    # Format 'HH:MM' dilengkapi detik agar bisa dibaca sebagai timedelta
+    jam = jam.where(jam.str.count(':') != 1, jam + ':00')
+    return df['date'].dt.normalize() + pd.to_timedelta(jam, errors='coerce')
+
+# Ubah teks jam mulai shift ('06:00, 18:00') menjadi daftar menit sejak tengah malam (urut naik)
+def parse_shift_starts(text):
+    shift_starts = []
+    for token in text.split(','):
+        jam, _, menit = token.strip().partition(':')
+        shift_starts.append(int(jam) * 60 + int(menit or 0))
+    if not shift_starts or any(m < 0 or m >= 24 * 60 for m in shift_starts):
+        raise ValueError("Jam mulai shift harus di antara 00:00 dan 23:59")
+    return sorted(set(shift_starts))
+
+# Kalender operasional: dumping sebelum shift pertama dimulai masuk ke hari operasional sebelumnya.
+# Semua kolom dihitung sekali saat ingest dengan offset integer (vectorized), bukan logika per baris.
+def apply_shift_calendar(df, shift_starts):
+    starts = np.asarray(shift_starts, dtype=np.int64)
+    waktu = df['datetime_dumping']
+    valid = waktu.notna().to_numpy()
+    menit = (waktu.dt.hour * 60 + waktu.dt.minute).fillna(0).to_numpy(dtype=np.int64)
+
+    geser_hari = (menit < starts[0]).astype(np.int64)
+    df['tanggal_operasional'] = waktu.dt.normalize() - pd.to_timedelta(geser_hari, unit='D')
+    # searchsorted - 1 = shift yang sedang berjalan; -1 berarti shift terakhir yang melewati tengah malam
+    shift_idx = np.searchsorted(starts, menit, side='right') - 1
+    shift_labels = np.array([f"Shift {i + 1}" for i in range(len(starts))], dtype=object)
+    df['shift_operasional'] = np.where(valid, np.take(shift_labels, shift_idx), None)
+    df['hour'] = waktu.dt.hour
+    df['jam_operasional'] = pd.Series((menit - starts[0]) % (24 * 60) // 60, index=df.index).where(valid)
+    return df
+
+# Posisi k nilai tertinggi (urut turun) dan k nilai terendah yang > 0 (urut naik) dengan argpartition,
+# tanpa mengurutkan seluruh vektor. Nilai seri di batas ke-k dipilih sama seperti urutan tabel lengkap
+# (argsort stabil turun): top mengambil posisi terkecil, bottom mengambil posisi terbesar.
+def top_bottom_k(values, k=10):
+    values = np.asarray(values)
+    nonzero = np.flatnonzero(values > 0)
+    k = min(k, len(nonzero))
+    if k == 0:
+        return nonzero, nonzero
+
+    def pilih(keys, posisi):
+        batas = keys[np.argpartition(keys, k - 1)[k - 1]]
+        pasti = posisi[keys < batas]
+        seri = posisi[keys == batas]
+        return np.concatenate([pasti, seri[:k - len(pasti)]])
+
+    top = pilih(-values[nonzero], nonzero)
+    bottom = pilih(values[nonzero[::-1]], nonzero[::-1])
+    top = top[np.lexsort((top, -values[top]))]
+    bottom = bottom[np.lexsort((-bottom, values[bottom]))]
+    return top, bottom
+
+# Skor jarak: 1 poin per km, sisa >= 0,5 km dibulatkan ke atas (2,5 km -> 3)
+def skor_jarak(jarak_km):
+    return np.floor(np.asarray(jarak_km, dtype=float) + 0.5)
+
+# Normalisasi nama operator: huruf kecil, tanda baca dibuang, spasi dirapikan ('BUDI SANTOSO ' -> 'budi santoso')
+def normalize_operator_name(names):
+    return names.astype(str).str.casefold().str.replace(r'[^\w\s]', ' ', regex=True).str.split().str.join(' ')
+
+# Terapkan normalisasi + tabel alias pada nilai unik saja, lalu remap lewat kode integer per baris
+def apply_operator_aliases(nama_operator, operator_aliases):
+    codes, uniques = pd.factorize(nama_operator)
+    kunci = normalize_operator_name(pd.Series(uniques, dtype=object))
+    # Alias bisa berantai (a -> b -> c); ikuti sampai nama kanonik
+    for _ in range(5):
+        kunci = kunci.map(operator_aliases).fillna(kunci)
+    canonical = kunci.str.title().to_numpy(dtype=object)
+    return pd.Series(np.where(codes >= 0, canonical[np.maximum(codes, 0)], None), index=nama_operator.index)
+
+# Nama pendek cocok jika token pertama sama dan setiap token berikutnya adalah awalan token nama panjang ('budi s' ~ 'budi santoso')
+def is_abbreviation(pendek, panjang):
+    a, b = pendek.split(), panjang.split()
+    return 1 < len(a) <= len(b) and a[0] == b[0] and all(t == b[i] or (t.isalpha() and b[i].startswith(t)) for i, t in enumerate(a))
+
+# Batas atas rasio SequenceMatcher (quick_ratio: irisan multiset huruf) untuk semua pasangan dalam satu blok
+# sekaligus dengan numpy; hanya pasangan yang lolos batas ini yang dihitung rasio sebenarnya
+def candidate_pairs(names, min_ratio, max_cells=2**22):
+    huruf = {c: k for k, c in enumerate(sorted(set(''.join(names))))}
+    char_counts = np.zeros((len(names), len(huruf)), dtype=np.int16)
+    for i, nama in enumerate(names):
+        for c in nama:
+            char_counts[i, huruf[c]] += 1
+    panjang = char_counts.sum(axis=1)
+    # Jumlah baris per potongan dibatasi agar array sementara (baris x nama x huruf) tetap kecil
+    chunk_rows = max(1, max_cells // max(1, char_counts.size))
+    pairs = []
+    for start in range(0, len(names), chunk_rows):
+        # Hanya pasangan (i, j) dengan j > i: baris potongan ini dibandingkan dengan nama sesudahnya
+        sesudah = char_counts[start:]
+        irisan = np.minimum(char_counts[start:start + chunk_rows, None, :], sesudah[None, :, :]).sum(axis=2)
+        batas_atas = 2 * irisan / (panjang[start:start + chunk_rows, None] + panjang[None, start:])
+        i, j = np.nonzero(np.triu(batas_atas >= min_ratio, k=1))
+        pairs.extend(zip((i + start).tolist(), (j + start).tolist()))
+    return pairs
+
+# Usulan penggabungan nama operator yang mirip, hanya di dalam blok sehingga tidak membandingkan semua pasangan:
+# himpunan token sama, singkatan (token pertama sama) dan kemiripan huruf (3 huruf awal sama). Nama dengan
+# angka berbeda ('operator 1' vs 'operator 12', 'budi santoso 2' vs 'budi santoso') tidak pernah diusulkan.
+def suggest_operator_merges(name_counts, min_ratio=0.9):
+    from difflib import SequenceMatcher
+
+    kunci = normalize_operator_name(pd.Series(name_counts.index, dtype=object)).tolist()
+    counts = dict(zip(kunci, name_counts.to_numpy()))
+    blocks = {'token': {}, 'depan': {}, 'awal': {}}
+    for nama in counts:
+        blocks['token'].setdefault(' '.join(sorted(nama.split())), []).append(nama)
+        blocks['depan'].setdefault(nama.split()[0] if nama else '', []).append(nama)
+        blocks['awal'].setdefault(nama[:3], []).append(nama)
+
+    angka = {nama: re.findall(r'\d+', nama) for nama in counts}
+    usulan = {}
+
+    def usulkan(a, b, alasan):
+        if angka[a] != angka[b]:
+            return
+        # Nama kanonik = yang lebih panjang, lalu yang lebih sering muncul
+        alias, canonical = sorted((a, b), key=lambda n: (len(n), counts[n]))
+        usulan.setdefault(alias, (canonical, alasan))
+
+    for anggota in blocks['token'].values():
+        for i, a in enumerate(anggota):
+            for b in anggota[i + 1:]:
+                usulkan(a, b, 'token sama')
+    for anggota in blocks['depan'].values():
+        for i, a in enumerate(anggota):
+            for b in anggota[i + 1:]:
+                if is_abbreviation(*sorted((a, b), key=len)):
+                    usulkan(a, b, 'singkatan')
+    for anggota in blocks['awal'].values():
+        if len(anggota) < 2:
+            continue
+        for i, j in candidate_pairs(anggota, min_ratio):
+            if angka[anggota[i]] != angka[anggota[j]]:
+                continue
+            rasio = SequenceMatcher(None, anggota[i], anggota[j]).ratio()
+            if rasio >= min_ratio:
+                usulkan(anggota[i], anggota[j], f'mirip {rasio:.0%}')
+    return pd.DataFrame(
+        [(alias, canonical, alasan, False) for alias, (canonical, alasan) in usulan.items()],
+        columns=['alias', 'nama_kanonik', 'alasan', 'gabung']
+    )
+
+# Kelas dump truck = nama tanpa nomor unit di belakang ('DT-41' -> 'DT', 'HD785-07' -> 'HD785')
+def truck_class(trucks):
+    return trucks.astype(str).str.strip().str.replace(r'[\s\-_]*\d+$', '', regex=True).str.upper()
+
+# Persentil per grup tanpa loop: urutkan (grup, nilai) sekali lalu interpolasi linear pada posisi q x (n - 1) tiap grup
+def grouped_percentiles(codes, values, n_group, qs):
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    n = np.bincount(codes, minlength=n_group)
+    start = np.concatenate([[0], np.cumsum(n)[:-1]])
+    result = np.full((n_group, len(qs)), np.nan)
+    ada = n > 0
+    for j, q in enumerate(qs):
+        posisi = q * (n[ada] - 1)
+        bawah = np.floor(posisi).astype(np.int64)
+        atas = np.minimum(bawah + 1, n[ada] - 1)
+        frac = posisi - bawah
+        result[ada, j] = sorted_values[start[ada] + bawah] * (1 - frac) + sorted_values[start[ada] + atas] * frac
+    return result
+
+# Proses sekali saat ingest: jam dumping dipetakan ke hari/shift operasional dan nama operator dinormalisasi + alias
+def prepare_dataset(df, shift_starts, operator_aliases):
+    if 'jam dumping' in df.columns:
+        df['datetime_dumping'] = parse_jam_dumping(df)
+        df = apply_shift_calendar(df, shift_starts)
+    if 'nama operator' in df.columns:
+        df['nama operator'] = apply_operator_aliases(df['nama operator'], operator_aliases)
+    return df
+
+# Kunci dataset bersama: hash isi file (sha256), jenis file, kalender shift dan alias operator
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+def dataset_key(file_hash, filename, shift_starts, operator_aliases):
+    return (
+        file_hash,
+        os.path.splitext(filename)[1].lower(),
+        tuple(shift_starts),
+        json.dumps(operator_aliases, sort_keys=True)
+    )
+
+# Kolom numpy (angka, tanggal) dijadikan read-only tanpa menyalin data; kolom string Arrow dipakai apa adanya.
+# Turunan (filter, .copy(), assign) tetap bisa ditulis, tapi menulis langsung ke dataset bersama akan error.
+def freeze_dataframe(df):
+    columns = {}
+    for column in df.columns:
+        values = df[column].array
+        if isinstance(df[column].dtype, np.dtype):
+            values = df[column].to_numpy()
+            values.flags.writeable = False
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+# Cache dataset hasil ingest yang dipakai bersama semua sesi dalam satu proses server.
+# Batas memori dalam byte; dataset yang paling lama tidak dipakai dibuang utuh (LRU).
+# Dataset yang sama hanya di-load sekali walau banyak sesi meng-upload bersamaan.
+class DatasetCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                return self._datasets[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._datasets:
+                    self._datasets.move_to_end(key)
+                    return self._datasets[key][0]
+            try:
+                df = freeze_dataframe(loader())
+                nbytes = int(df.memory_usage(index=True, deep=True).sum())
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            # Dataset masuk cache dan tanda loading dilepas bersamaan, agar sesi yang datang tidak mem-parse ulang
+            with self._lock:
+                self._datasets[key] = (df, nbytes)
+                self._loading.pop(key, None)
+                # Dataset terbaru selalu disimpan walau sendirian melebihi batas
+                while len(self._datasets) > 1 and self.total_bytes() > self.max_bytes:
+                    self._datasets.popitem(last=False)
+        return df
+
+    def total_bytes(self):
+        return sum(nbytes for _, nbytes in self._datasets.values())
+
+    def clear(self):
+        with self._lock:
+            self._datasets.clear()
+
+    # Ringkasan isi cache (dari yang paling lama tidak dipakai)
+    def stats(self):
+        with self._lock:
+            return [
+                {'dataset': key[0][:12] + key[1], 'baris': len(df), 'memori_mb': round(nbytes / 2**20, 1)}
+                for key, (df, nbytes) in self._datasets.items()
+            ]
+
+# Hari operasional per baris (dumping setelah tengah malam ikut hari mulai shift malam);
+# baris tanpa jam dumping yang valid, atau data tanpa kalender shift, memakai tanggal kalender
+def operational_dates(df):
+    tanggal = df['date'].dt.normalize()
+    if 'tanggal_operasional' not in df.columns:
+        return tanggal
+    return df['tanggal_operasional'].fillna(tanggal)
+
+# Rentang hari operasional pada data (nilai awal input tanggal)
+def date_bounds(df):
+    tanggal = operational_dates(df)
+    return tanggal.min(), tanggal.max()
+
+# Filter rentang hari operasional (inklusif), sehingga shift malam tidak terpotong di kedua ujung rentang.
+# Tanpa .copy(): copy-on-write pandas melindungi dataset bersama, jadi tiap sesi tidak menyalin seluruh data.
+def filter_by_date(df, date_start, date_end):
+    date_start, date_end = pd.to_datetime(date_start).normalize(), pd.to_datetime(date_end).normalize()
+    tanggal = operational_dates(df)
+    if tanggal.min() >= date_start and tanggal.max() <= date_end:
+        # Rentang mencakup semua data: objek baru (kolom bisa ditambah) yang berbagi data tanpa menyalin
+        return df.copy(deep=False)
+    return df[(tanggal >= date_start) & (tanggal <= date_end)]
+
+# Filter satu kolom; daftar kosong berarti semua nilai
+def filter_by_values(df, column, values):
+    return df[df[column].isin(values)] if values else df
+
+# Kolom filter sidebar, diterapkan berurutan
+FILTER_COLUMNS = ['shift', 'dump truck', 'exca', 'loading point', 'dumping point']
+
+def filter_dataset(df, date_start, date_end, filters=None):
+    df = filter_by_date(df, date_start, date_end)
+    for column in FILTER_COLUMNS:
+        df = filter_by_values(df, column, (filters or {}).get(column))
+    return df
+
+# Status rakor yang punya target bulanan
+RAKOR_STATUSES = [
+    'FOB MV',
+    'Rehandling Blok Timur',
+    'Rehandling Antar Stock Blok Barat',
+    'Rehandling Antar Stock Blok Timur',
+    'Rehandling Blok Barat',
+    'Housekeeping',
+    'Rehandling Pengiriman Konsumen'
+]
+
+def get_value_by_status(df, status_name):
+    rows = df[df['status'] == status_name]
+    if not rows.empty:
+        return float(rows['tonase'].sum())
+    else:
+        return 0.00
+
+# Target rakor (per status) dan SPPH/Mitra dipetakan ke dataset beserta pembagian harian/mingguan periode rakor.
+# Kolom target ditambahkan lewat assign (salinan dangkal): kolom data lain tetap berbagi memori dengan dataset bersama.
+def assign_targets(df, rakor_targets, spph_mitra_targets, num_days_rakor):
+    target_rakor = df['status'].map(rakor_targets).fillna(0)
+    target_spph_mitra = df['spph'].map(spph_mitra_targets).fillna(0)
+    return df.assign(
+        target_rakor=target_rakor,
+        target_rakor_harian=target_rakor / num_days_rakor,
+        target_rakor_mingguan=target_rakor / num_days_rakor * 7,
+        target_spph_mitra=target_spph_mitra,
+        target_spph_mitra_harian=target_spph_mitra / num_days_rakor,
+        target_spph_mitra_mingguan=target_spph_mitra / num_days_rakor * 7
+    )
+
+# Target tersimpan (json) untuk laporan tanpa dashboard; status yang belum punya target memakai tonase aktual,
+# sama seperti nilai awal input target di dashboard
+def assign_saved_targets(df, rakor_targets, spph_mitra_targets, date_start, date_end):
+    rakor_targets = {status: rakor_targets.get(status, get_value_by_status(df, status)) for status in RAKOR_STATUSES}
+    num_days_rakor = (pd.to_datetime(date_end) - pd.to_datetime(date_start)).days + 1
+    return assign_targets(df, rakor_targets, spph_mitra_targets, num_days_rakor)
+
+# Jumlah hari dalam bulan berjalan (dasar pembagian target harian/mingguan pada tabel)
+def days_in_current_month():
+    return calendar.monthrange(datetime.now().year, datetime.now().month)[1]
+
+# Tonase per SPPH ditambah SGJTotal (SGJ1 + SGJ2 + SGJ3 + SPARE) dan Grand Total
+def build_spph_summary(df):
+    spph_df = df.groupby("spph", as_index=False)["tonase"].sum()
+
+    # Menghitung SGJTotal dari penjumlahan SGJ1, SGJ2, SGJ3, dan SPARE
+    sgj_total = spph_df[spph_df["spph"].isin(["SGJ1", "SGJ2", "SGJ3", "SPARE"])]["tonase"].sum()
+
+    # Menambahkan SGJTotal ke dataframe
+    sgj_total_row = pd.DataFrame({"spph": ["SGJTotal"], "tonase": [sgj_total]})
+    spph_df = pd.concat([spph_df, sgj_total_row], ignore_index=True)
+
+    # Menghitung Grand Total dari seluruh tonase kecuali SGJTotal
+    grand_total = spph_df[spph_df["spph"] != "SGJTotal"]["tonase"].sum()
+
+    # Menambahkan Grand Total sebagai baris baru ke spph_df
+    grand_total_row = pd.DataFrame({"spph": ["Grand Total"], "tonase": [grand_total]})
+    return pd.concat([spph_df, grand_total_row], ignore_index=True)
+
+# Tabel Target Rakor vs Actual per status, ditambah baris Total tanpa Housekeeping
+def build_rakor_table(df, days_in_month):
+    weeks_in_month = days_in_month / 7
+
+    # Pengelompokan dan agregasi
+    rakor_df = df.groupby("status", as_index=False).agg({
+        "tonase": "sum", 
+        "target_rakor": "first"
+    })
+
+    # Menghitung target harian dan mingguan berdasarkan target bulanan
+    rakor_df["target_rakor_harian"] = (rakor_df["target_rakor"] / days_in_month).round(2)
+    rakor_df["target_rakor_mingguan"] = (rakor_df["target_rakor"] / weeks_in_month).round(2)
+
+    # Menghitung perbedaan dan pencapaian persentase
+    rakor_df["difference"] = rakor_df.apply(
+        lambda row: round(max(row["target_rakor"] - row["tonase"], 0), 2) if row["target_rakor"] > 0 else 0, axis=1
+    )
+    rakor_df["percent achievement"] = rakor_df.apply(
+        lambda row: round((row["tonase"] / row["target_rakor"] * 100), 2) if row["target_rakor"] > 0 else 0, axis=1
+    )
+
+    # Membulatkan tonase dan target_rakor di DataFrame
+    rakor_df["tonase"] = rakor_df["tonase"].round(2)  # Pembulatan ke bilangan bulat
+    rakor_df["target_rakor"] = rakor_df["target_rakor"].round(2)  # Pembulatan ke bilangan bulat
+
+    # Menghilangkan Housekeeping dari total
+    rakor_df_no_housekeeping = rakor_df.loc[rakor_df["status"] != "Housekeeping"]
+
+    # Menambahkan baris total tanpa Housekeeping
+    total_row = pd.DataFrame({
+        "status": ["Total"],
+        "tonase": [round(rakor_df_no_housekeeping["tonase"].sum(), 0)],  # Total tonase tanpa Housekeeping
+        "target_rakor": [round(rakor_df_no_housekeeping["target_rakor"].sum(), 0)],  # Total target_rakor tanpa Housekeeping
+        "target_rakor_harian": [round(rakor_df_no_housekeeping["target_rakor_harian"].sum(), 2)],  # Total target_rakor_harian tanpa Housekeeping
+        "target_rakor_mingguan": [round(rakor_df_no_housekeeping["target_rakor_mingguan"].sum(), 2)],  # Total target_rakor_mingguan tanpa Housekeeping
+        "difference": [round(rakor_df_no_housekeeping["difference"].sum(), 2)],  # Total difference tanpa Housekeeping
+        "percent achievement": [round(rakor_df_no_housekeeping["percent achievement"].mean(), 2)]  # Rata-rata percent achievement tanpa Housekeeping
+    })
+
+    # Menggabungkan baris total ke akhir DataFrame
+    rakor_df = pd.concat([rakor_df, total_row], ignore_index=True)
+    return rakor_df
+
+# Tabel Target SPPH/Mitra vs Actual, ditambah baris SGJ Total dan Total
+def build_spph_mitra_table(df, days_in_month):
+    weeks_in_month = days_in_month / 7
+
+    # Grouping and aggregation
+    spph_mitra_df = df.groupby("spph", as_index=False).agg({
+        "tonase": "sum", 
+        "target_spph_mitra": "first"
+    })
+
+    # Menghitung SGJ Total dari SGJ1, SGJ2, SGJ3, dan SPARE
+    sgj_total_tonase = spph_mitra_df[spph_mitra_df['spph'].isin(['SGJ1', 'SGJ2', 'SGJ3', 'SPARE'])]['tonase'].sum()
+    sgj_total_target = spph_mitra_df[spph_mitra_df['spph'].isin(['SGJ1', 'SGJ2', 'SGJ3', 'SPARE'])]['target_spph_mitra'].sum()
+
+    # Menambahkan baris SGJ Total ke DataFrame
+    sgj_total_row = pd.DataFrame({
+        "spph": ["SGJ Total"],
+        "tonase": [round(sgj_total_tonase, 2)],  # Membulatkan tonase
+        "target_spph_mitra": [round(sgj_total_target, 2)],  # Membulatkan target
+        "target_spph_mitra_harian": [round(sgj_total_target / days_in_month, 2)],  # Membulatkan target harian
+        "target_spph_mitra_mingguan": [round(sgj_total_target / weeks_in_month, 2)],  # Membulatkan target mingguan
+        "difference": [round(max(sgj_total_target - sgj_total_tonase, 0), 2)],  # Membulatkan perbedaan
+        "percent achievement": [round((sgj_total_tonase / sgj_total_target * 100), 2) if sgj_total_target > 0 else 0]  # Membulatkan pencapaian persentase
+    })
+
+    # Menghitung target harian dan mingguan berdasarkan target bulanan
+    spph_mitra_df["tonase"] = spph_mitra_df["tonase"].round(2)
+    spph_mitra_df["target_spph_mitra_harian"] = spph_mitra_df["target_spph_mitra"] / days_in_month
+    spph_mitra_df["target_spph_mitra_harian"] = spph_mitra_df["target_spph_mitra_harian"].round(2)
+    spph_mitra_df["target_spph_mitra_mingguan"] = spph_mitra_df["target_spph_mitra"] / weeks_in_month
+    spph_mitra_df["target_spph_mitra_mingguan"] = spph_mitra_df["target_spph_mitra_mingguan"].round(2)
+
+    # Menghitung perbedaan dan pencapaian persentase
+    spph_mitra_df["difference"] = spph_mitra_df.apply(lambda row: round(max(row["target_spph_mitra"] - row["tonase"], 0), 2) if row["target_spph_mitra"] > 0 else 0, axis=1)
+    spph_mitra_df["percent achievement"] = spph_mitra_df.apply(lambda row: round((row["tonase"] / row["target_spph_mitra"] * 100), 2) if row["target_spph_mitra"] > 0 else 0, axis=1)
+
+    # Menambahkan SGJ Total ke dalam DataFrame
+    spph_mitra_df = pd.concat([spph_mitra_df, sgj_total_row], ignore_index=True)
+
+    # Menambahkan baris Total tanpa SGJ Total
+    total_row2 = pd.DataFrame({
+        "spph": ["Total"],
+        "tonase": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["tonase"].sum(), 2)],
+        "target_spph_mitra": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["target_spph_mitra"].sum(), 2)],
+        "target_spph_mitra_harian": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["target_spph_mitra_harian"].sum(), 2)],
+        "target_spph_mitra_mingguan": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["target_spph_mitra_mingguan"].sum(), 2)],
+        "difference": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["difference"].sum(), 2)],
+        "percent achievement": [round(spph_mitra_df[~spph_mitra_df['spph'].isin(['SGJ Total'])]["percent achievement"].mean(), 2)]
+    })
+
+    # Menambahkan total_row2 ke DataFrame hanya sekali
+    spph_mitra_df = pd.concat([spph_mitra_df, total_row2], ignore_index=True)
+    return spph_mitra_df
+# Analisis loading excavator (cache per dataset, dipakai beberapa bagian)
+def compute_exca_loading(df, batas_jeda):
+    # Mitra dan lokasi ikut dibawa agar cube match factor bisa difilter seperti form Jam Dumping
+    kolom_pilihan = [c for c in ['spph', 'lokasi'] if c in df.columns]
+    events = df[['exca', 'loading point', 'dump truck', 'tonase', 'datetime_dumping', 'tanggal_operasional', 'jam_operasional'] + kolom_pilihan].copy()
+    events = events.dropna(subset=['exca', 'datetime_dumping'])
+    events = events.sort_values(['exca', 'datetime_dumping'], kind='mergesort').reset_index(drop=True)
+
+    # Jeda antar truk yang dilayani excavator yang sama (grouped diff, vectorized)
+    events['jeda_menit'] = events.groupby('exca')['datetime_dumping'].diff().dt.total_seconds() / 60
+
+    # Sesi baru jika excavator/loading point berganti atau jeda melebihi batas (istirahat, ganti shift)
+    sesi_baru = (
+        events['jeda_menit'].isna()
+        | (events['jeda_menit'] > batas_jeda)
+        | (events['loading point'] != events['loading point'].shift())
+    )
+    events['sesi'] = sesi_baru.cumsum()
+    events.loc[sesi_baru, 'jeda_menit'] = np.nan
+
+    # Perkiraan waktu layan excavator = kuartil bawah jeda dalam sesi (truk datang beruntun)
+    waktu_layan = events.groupby('exca')['jeda_menit'].quantile(0.25)
+    events['waktu_layan_menit'] = events['exca'].map(waktu_layan).fillna(0)
+
+    # Waktu tunggu truk dengan rekursi Lindley: W_n = max(0, W_{n-1} + layan - jeda_n).
+    # Bentuk tertutupnya S_n - min(0, min S_k) sehingga cukup cumsum/cummin per sesi.
+    langkah = (events['waktu_layan_menit'] - events['jeda_menit']).fillna(0)
+    kumulatif = langkah.groupby(events['sesi']).cumsum()
+    events['waktu_tunggu_menit'] = kumulatif - kumulatif.groupby(events['sesi']).cummin().clip(upper=0)
+    events['antrian_truk'] = np.where(
+        events['waktu_layan_menit'] > 0,
+        events['waktu_tunggu_menit'] / events['waktu_layan_menit'].where(events['waktu_layan_menit'] > 0, 1),
+        0
+    )
+    events['idle_menit'] = (events['jeda_menit'] - events['waktu_layan_menit']).clip(lower=0)
+    events['jam_bucket'] = events['datetime_dumping'].dt.floor('h')
+
+    summary = events.groupby(['exca', 'loading point'], as_index=False).agg(
+        total_ritase=('datetime_dumping', 'size'),
+        total_tonase=('tonase', 'sum'),
+        jam_aktif=('jam_bucket', 'nunique'),
+        rata2_jeda_menit=('jeda_menit', 'mean'),
+        waktu_layan_menit=('waktu_layan_menit', 'first'),
+        rata2_tunggu_menit=('waktu_tunggu_menit', 'mean'),
+        rata2_antrian_truk=('antrian_truk', 'mean'),
+        total_jeda_menit=('jeda_menit', 'sum'),
+        total_idle_menit=('idle_menit', 'sum')
+    )
+    summary['ritase_per_jam'] = summary['total_ritase'] / summary['jam_aktif']
+    summary['idle_persen'] = np.where(
+        summary['total_jeda_menit'] > 0,
+        summary['total_idle_menit'] / summary['total_jeda_menit'].where(summary['total_jeda_menit'] > 0, 1) * 100,
+        0
+    )
+    summary = summary.drop(columns=['total_jeda_menit', 'total_idle_menit']).round(2)
+
+    # Index baris per excavator agar drill-down tidak memindai ulang seluruh data
+    exca_index = {str(k): v for k, v in events.groupby('exca').indices.items()}
+    return events.drop(columns=['jam_bucket']), summary, exca_index
+
+# Cube match factor per loading point x hari operasional x jam x excavator x dump truck (dihitung sekali per dataset).
+# Waktu layan excavator tetap dari seluruh armada; mitra dan lokasi ikut jadi dimensi sehingga
+# pilihan form Jam Dumping (mitra, dump truck, lokasi) diterapkan saat rollup.
+def compute_match_factor_cube(df, batas_jeda=60.0):
+    events, _, _ = compute_exca_loading(df, batas_jeda)
+
+    # Waktu siklus truk = jeda antar dumping oleh dump truck yang sama (dalam satu sesi)
+    urutan_truk = events.sort_values(['dump truck', 'datetime_dumping'], kind='mergesort')
+    siklus_truk = urutan_truk.groupby('dump truck')['datetime_dumping'].diff().dt.total_seconds() / 60
+    events['siklus_truk_menit'] = siklus_truk.where(siklus_truk <= batas_jeda)
+
+    events['day'] = events['tanggal_operasional']
+    events['hour'] = events['datetime_dumping'].dt.hour
+    dimensi = ['loading point', 'day', 'jam_operasional', 'hour', 'exca', 'dump truck'] + [c for c in ['spph', 'lokasi'] if c in events.columns]
+    cube = events.groupby(dimensi, dropna=False, as_index=False).agg(
+        ritase=('datetime_dumping', 'size'),
+        siklus_loader_sum=('waktu_layan_menit', 'sum'),
+        siklus_loader_n=('waktu_layan_menit', 'count'),
+        siklus_truk_sum=('siklus_truk_menit', 'sum'),
+        siklus_truk_n=('siklus_truk_menit', 'count')
+    )
+    return cube
+
+# Rollup cube ke loading point x jam untuk rentang hari tertentu;
+# selection = (mitra, dump truck, lokasi) dari form Jam Dumping, None = seluruh armada
+def rollup_match_factor(cube, date_start, date_end, selection=None):
+    cube = cube[(cube['day'] >= pd.to_datetime(date_start)) & (cube['day'] <= pd.to_datetime(date_end))]
+    if selection is not None:
+        cube = filter_jam_dumping_selection(cube, *selection)
+    # Jumlah truk dan excavator aktif per loading point x jam di setiap hari, lalu dirata-rata antar hari
+    cube = cube.groupby(['loading point', 'day', 'jam_operasional', 'hour'], as_index=False).agg(
+        n_truk=('dump truck', 'nunique'),
+        n_exca=('exca', 'nunique'),
+        ritase=('ritase', 'sum'),
+        siklus_loader_sum=('siklus_loader_sum', 'sum'),
+        siklus_loader_n=('siklus_loader_n', 'sum'),
+        siklus_truk_sum=('siklus_truk_sum', 'sum'),
+        siklus_truk_n=('siklus_truk_n', 'sum')
+    )
+    mf_df = cube.groupby(['loading point', 'jam_operasional', 'hour'], as_index=False).agg(
+        rata2_truk=('n_truk', 'mean'),
+        rata2_exca=('n_exca', 'mean'),
+        ritase=('ritase', 'sum'),
+        siklus_loader_sum=('siklus_loader_sum', 'sum'),
+        siklus_loader_n=('siklus_loader_n', 'sum'),
+        siklus_truk_sum=('siklus_truk_sum', 'sum'),
+        siklus_truk_n=('siklus_truk_n', 'sum')
+    )
+    mf_df['siklus_loader_menit'] = mf_df['siklus_loader_sum'] / mf_df['siklus_loader_n'].replace(0, np.nan)
+    mf_df['siklus_truk_menit'] = mf_df['siklus_truk_sum'] / mf_df['siklus_truk_n'].replace(0, np.nan)
+    # Match factor = (jumlah truk x siklus loader) / (jumlah excavator x siklus truk)
+    mf_df['match_factor'] = (
+        mf_df['rata2_truk'] * mf_df['siklus_loader_menit']
+        / (mf_df['rata2_exca'] * mf_df['siklus_truk_menit'])
+    )
+    mf_df = mf_df.drop(columns=['jam_operasional', 'siklus_loader_sum', 'siklus_loader_n', 'siklus_truk_sum', 'siklus_truk_n'])
+    return mf_df.round(2)
+
+# Total ritase per (operator, mitra) dipisah per mitra, dihitung sekali per dataset.
+# Kombinasi mitra apa pun cukup menjumlahkan beberapa baris matriks kecil ini.
+def compute_operator_ritase_matrix(df):
+    # SGJ1, SGJ2, SGJ3 dan SPARE dijadikan satu SGJ; setiap baris dihitung sebagai 1 ritase
+    mitra = df['spph'].replace({
+        'SGJ1': 'SGJ',
+        'SGJ2': 'SGJ',
+        'SGJ3': 'SGJ',
+        'SPARE': 'SGJ'
+    })
+    operator_codes, operators = pd.factorize(df['nama operator'])
+    mitra_codes, mitras = pd.factorize(mitra)
+    valid = (operator_codes >= 0) & (mitra_codes >= 0)
+    n_mitra = len(mitras)
+
+    pair_keys, pair_codes = np.unique(operator_codes[valid] * n_mitra + mitra_codes[valid], return_inverse=True)
+    n_pair = len(pair_keys)
+    ritase_matrix = np.bincount(
+        mitra_codes[valid] * n_pair + pair_codes, minlength=n_mitra * n_pair
+    ).reshape(n_mitra, n_pair)
+
+    pair_labels = (
+        np.asarray(operators, dtype=object)[pair_keys // n_mitra] + " ("
+        + np.asarray(mitras, dtype=object)[pair_keys % n_mitra] + ")"
+    )
+    # Kode (operator, mitra) dan kode mitra per baris (-1 jika kosong) untuk agregasi lain dengan bobot
+    row_pair_codes = np.full(len(df), -1, dtype=np.int64)
+    row_pair_codes[valid] = pair_codes
+    row_mitra_codes = np.where(valid, mitra_codes, -1)
+    return ritase_matrix, pair_labels, [str(m) for m in mitras], row_pair_codes, row_mitra_codes
+
+# Kode rute (loading point, dumping point) per baris: kode = indeks loading point x jumlah dumping point + indeks dumping point
+def compute_route_codes(df):
+    lp_codes, loading_points = pd.factorize(df['loading point'])
+    dp_codes, dumping_points = pd.factorize(df['dumping point'])
+    valid = (lp_codes >= 0) & (dp_codes >= 0)
+    route_codes = np.where(valid, lp_codes * len(dumping_points) + dp_codes, -1)
+    return route_codes, [str(x) for x in loading_points], [str(x) for x in dumping_points]
+
+# Array jarak (km) per kode rute dari matriks jarak {loading point: {dumping point: km}}
+def route_distance_array(route_distances, loading_points, dumping_points):
+    jarak = pd.Series({
+        (lp, dp): km for lp, tujuan in route_distances.items() for dp, km in tujuan.items()
+    }, dtype=float)
+    routes = pd.MultiIndex.from_product([loading_points, dumping_points])
+    return jarak.reindex(routes).fillna(0.0).to_numpy() if len(jarak) else np.zeros(len(routes))
+
+# Jarak per baris lewat lookup kode rute (tanpa merge string); rute tanpa jarak = 0 km
+def lookup_route_distance(route_codes, distance_array):
+    return np.where(route_codes >= 0, distance_array[np.maximum(route_codes, 0)], 0.0)
+
+# Cube produktivitas haul: grain (dump truck, operator, mitra, shift, exca, rute, jam) dengan kode integer.
+# Dibangun dari dataset per rentang tanggal (bukan hasil filter sidebar); kolom filter sidebar ikut jadi dimensi
+# sehingga pilihan sidebar diterapkan saat rollup. Jarak rute di-lookup saat rollup, sehingga perubahan
+# matriks jarak tidak menghitung ulang cube.
+def compute_productivity_cube(df):
+    route_codes, _, _ = compute_route_codes(df)
+    _, _, _, row_pair_codes, row_mitra_codes = compute_operator_ritase_matrix(df)
+    cube = pd.DataFrame({
+        'dump truck': df['dump truck'].to_numpy(),
+        'operator': row_pair_codes,
+        'mitra': row_mitra_codes,
+        'shift': df['shift'].to_numpy(),
+        'exca': df['exca'].to_numpy(),
+        'loading point': df['loading point'].to_numpy(),
+        'dumping point': df['dumping point'].to_numpy(),
+        'route': route_codes,
+        'jam_bucket': df['datetime_dumping'].dt.floor('h').to_numpy(),
+        'tonase': df['tonase'].to_numpy()
+    })
+    return cube.groupby(
+        ['dump truck', 'operator', 'mitra', 'shift', 'exca', 'loading point', 'dumping point', 'route', 'jam_bucket'],
+        dropna=False, as_index=False
+    ).agg(
+        tonase=('tonase', 'sum'),
+        ritase=('tonase', 'size')
+    )
+
+# Rollup cube ke satu dimensi setelah pilihan filter sidebar diterapkan:
+# ton-km = tonase x jarak muatan, km tempuh = 2 x jarak (pergi-pulang) per ritase
+def rollup_productivity(cube, dimension, distance_array, filters=None):
+    for column in FILTER_COLUMNS:
+        cube = filter_by_values(cube, column, (filters or {}).get(column))
+    jarak_km = lookup_route_distance(cube['route'].to_numpy(), distance_array)
+    view = cube.assign(ton_km=cube['tonase'] * jarak_km, km_tempuh=cube['ritase'] * jarak_km * 2)
+    productivity_df = view.groupby(dimension, as_index=False).agg(
+        total_ritase=('ritase', 'sum'),
+        total_tonase=('tonase', 'sum'),
+        total_km_tempuh=('km_tempuh', 'sum'),
+        total_ton_km=('ton_km', 'sum'),
+        jam_aktif=('jam_bucket', 'nunique')
+    )
+    productivity_df['ton_km_per_jam'] = productivity_df['total_ton_km'] / productivity_df['jam_aktif'].replace(0, np.nan)
+    return productivity_df.round(2)
+
+# Ritase harian per (operator, mitra) sebagai prefix sum per hari operasional.
+# Total jendela [awal, akhir] = kumulatif[akhir] - kumulatif[awal - 1]; menambah satu hari cukup menambah satu vektor.
+def compute_operator_daily_cumsum(df):
+    _, _, _, row_pair_codes, _ = compute_operator_ritase_matrix(df)
+    day_codes, days = pd.factorize(df['tanggal_operasional'], sort=True)
+    valid = (row_pair_codes >= 0) & (day_codes >= 0)
+    n_pair = int(row_pair_codes.max()) + 1 if valid.any() else 0
+    daily = np.bincount(
+        day_codes[valid] * n_pair + row_pair_codes[valid], minlength=len(days) * n_pair
+    ).reshape(len(days), n_pair)
+    return np.cumsum(daily, axis=0), pd.DatetimeIndex(days)
+
+# Total ritase jendela bergulir untuk setiap hari akhir sekaligus (baris = hari akhir)
+def rolling_operator_totals(cumulative, days, window):
+    idx = np.arange(len(days))
+    if window == "Harian":
+        start = idx
+    elif window == "7 Hari Terakhir":
+        start = np.searchsorted(days, days - pd.Timedelta(days=6))
+    else:  # Month-to-Date
+        start = np.searchsorted(days, days.to_period('M').to_timestamp())
+    padded = np.vstack([np.zeros((1, cumulative.shape[1]), dtype=cumulative.dtype), cumulative])
+    return padded[idx + 1] - padded[start]
+
+# Matriks ritase operator x hari operasional x shift, dibangun sekali per dataset
+def compute_operator_shift_matrix(df):
+    _, operator_labels, _, row_pair_codes, _ = compute_operator_ritase_matrix(df)
+    day_codes, days = pd.factorize(df['tanggal_operasional'], sort=True)
+    shift_codes, shifts = pd.factorize(df['shift_operasional'], sort=True)
+    valid = (row_pair_codes >= 0) & (day_codes >= 0) & (shift_codes >= 0)
+    n_pair, n_day, n_shift = len(operator_labels), len(days), len(shifts)
+    flat_codes = (row_pair_codes[valid] * n_day + day_codes[valid]) * n_shift + shift_codes[valid]
+    return np.bincount(flat_codes, minlength=n_pair * n_day * n_shift).reshape(n_pair, n_day, n_shift)
+
+# Statistik konsistensi per operator (vectorized di atas matriks operator x hari x shift)
+def operator_consistency_stats(shift_matrix):
+    per_shift = shift_matrix.reshape(shift_matrix.shape[0], -1).astype(float)
+    per_day = shift_matrix.sum(axis=2).astype(float)
+    shift_kerja = (per_shift > 0).sum(axis=1)
+    hari_kerja = (per_day > 0).sum(axis=1)
+
+    # Hanya shift/hari yang benar-benar bekerja yang dihitung
+    per_shift[per_shift == 0] = np.nan
+    per_day[per_day == 0] = np.nan
+    median_armada = np.nanmedian(per_shift) if shift_kerja.any() else np.nan
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rata2_harian = np.nanmean(per_day, axis=1)
+        std_harian = np.nanstd(per_day, axis=1)
+        return pd.DataFrame({
+            'total_ritase': np.nansum(per_shift, axis=1).astype(int),
+            'shift_kerja': shift_kerja,
+            'hari_kerja': hari_kerja,
+            'ritase_per_shift': np.nansum(per_shift, axis=1) / shift_kerja,
+            'std_harian': std_harian,
+            'cv_harian': std_harian / rata2_harian,
+            'persen_shift_di_bawah_median': (per_shift < median_armada).sum(axis=1) / shift_kerja * 100
+        }), median_armada
+
+# Index baris per (operator, mitra): detail operator langsung mengambil barisnya tanpa memindai seluruh data
+def compute_operator_row_index(df):
+    _, _, _, row_pair_codes, _ = compute_operator_ritase_matrix(df)
+    return pd.Series(np.arange(len(df))).groupby(row_pair_codes).indices
+
+# Pasangan operator x excavator dalam bentuk sparse (koordinat): hanya kombinasi yang benar-benar muncul disimpan.
+# Waktu siklus = jeda antar ritase berurutan operator yang sama, dicatat pada pasangan ritase berikutnya.
+def compute_operator_exca_pairs(df, batas_jeda=60.0):
+    _, operator_labels, _, row_pair_codes, _ = compute_operator_ritase_matrix(df)
+    exca_codes, excas = pd.factorize(df['exca'])
+    valid = (row_pair_codes >= 0) & (exca_codes >= 0)
+    n_exca = len(excas)
+
+    keys, codes = np.unique(row_pair_codes[valid] * n_exca + exca_codes[valid], return_inverse=True)
+    n_key = len(keys)
+    ritase = np.bincount(codes, minlength=n_key)
+    tonase = np.bincount(codes, weights=df['tonase'].to_numpy(dtype=float)[valid], minlength=n_key)
+
+    siklus_sum = np.zeros(n_key)
+    siklus_n = np.zeros(n_key, dtype=np.int64)
+    waktu = df['datetime_dumping'].to_numpy(dtype='datetime64[s]')[valid]
+    ada_waktu = ~np.isnat(waktu)
+    if ada_waktu.any():
+        operator_codes = row_pair_codes[valid][ada_waktu]
+        detik = waktu[ada_waktu].astype(np.int64)
+        pair_codes = codes[ada_waktu]
+        order = np.lexsort((detik, operator_codes))
+        operator_codes, detik, pair_codes = operator_codes[order], detik[order], pair_codes[order]
+        jeda = np.diff(detik) / 60
+        sambung = (operator_codes[1:] == operator_codes[:-1]) & (jeda <= batas_jeda)
+        siklus_sum = np.bincount(pair_codes[1:][sambung], weights=jeda[sambung], minlength=n_key)
+        siklus_n = np.bincount(pair_codes[1:][sambung], minlength=n_key)
+
+    return pd.DataFrame({
+        'operator_mitra': operator_labels[keys // n_exca],
+        'exca': np.asarray([str(e) for e in excas], dtype=object)[keys % n_exca],
+        'total_ritase': ritase,
+        'total_tonase': tonase.round(2),
+        'rata2_siklus_menit': np.divide(siklus_sum, siklus_n, out=np.zeros(n_key), where=siklus_n > 0).round(2),
+        'jumlah_siklus': siklus_n
+    })
+
+# Histogram payload (tonase per ritase) dengan bin tetap per grup (dump truck / mitra), dihitung sekali per dataset.
+# Ganti truk cukup mengambil satu baris matriks hitungan.
+# Rentang bin dibatasi p99,9 tonase (dan 2x payload nominal terbesar bila diisi), sehingga salah input (mis. kg)
+# tidak membuat matriks raksasa; nilai di atas batas masuk kolom terakhir counts (overflow, mulai edges[-1]).
+def compute_payload_histograms(df, group_column, bin_width=1.0, max_nominal=None):
+    codes, groups = pd.factorize(df[group_column])
+    tonase = df['tonase'].to_numpy(dtype=float)
+    valid = (codes >= 0) & ~np.isnan(tonase) & (tonase >= 0)
+    n_group = len(groups)
+
+    batas_atas = np.quantile(tonase[valid], 0.999) if valid.any() else 0.0
+    if max_nominal:
+        batas_atas = min(batas_atas, 2 * max_nominal)
+    n_bins = int(np.floor(batas_atas / bin_width)) + 1
+    edges = np.arange(n_bins + 1) * bin_width
+    bins = np.minimum(np.floor(tonase[valid] / bin_width), n_bins).astype(np.int64)
+    counts = np.bincount(codes[valid] * (n_bins + 1) + bins, minlength=n_group * (n_bins + 1)).reshape(n_group, n_bins + 1)
+
+    persentil = grouped_percentiles(codes[valid], tonase[valid], n_group, [0.1, 0.5, 0.9])
+    ritase = counts.sum(axis=1)
+    total = np.bincount(codes[valid], weights=tonase[valid], minlength=n_group)
+    maks = np.full(n_group, np.nan)
+    np.fmax.at(maks, codes[valid], tonase[valid])
+    stats = pd.DataFrame({
+        group_column: [str(g) for g in groups],
+        'total_ritase': ritase,
+        'rata2_payload': np.divide(total, ritase, out=np.zeros(n_group), where=ritase > 0),
+        'p10': persentil[:, 0],
+        'p50': persentil[:, 1],
+        'p90': persentil[:, 2],
+        'maks_payload': maks,
+        'ritase_di_atas_batas': counts[:, -1]
+    }).round(2)
+    row_codes = np.where(valid, codes, -1)
+    return edges, counts, stats, row_codes
+
+# Berkas unduhan dibuat saat tombol diklik saja dan di-cache per isi dataset + format.
+# CSV ditulis per potongan baris agar tidak membuat satu string CSV raksasa di memori.
+def export_dataset(df, file_format, chunk_rows=50000):
+    buffer = io.BytesIO()
+    if file_format == 'parquet':
+        # Kolom object campuran (mis. jam sebagai time/str) disamakan jadi string agar bisa disimpan
+        object_columns = df.select_dtypes(include='object').columns
+        df.astype({c: 'string' for c in object_columns}).to_parquet(buffer, index=False)
+        return buffer.getvalue()
+
+    target = gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) if file_format == 'csv.gz' else buffer
+    with io.TextIOWrapper(target, encoding='utf-8', newline='') as text:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(text, index=False, header=start == 0)
+        text.flush()
+        if target is not buffer:
+            target.close()
+        data = buffer.getvalue()
+    return data
+
+# Laporan Excel multi-sheet ditulis baris per baris dengan mode constant_memory xlsxwriter
+# (memori tetap kecil walau data mentah ikut ditulis). Angka desimal memakai format 2 angka di belakang koma.
+# Data dikonversi per potongan baris sekaligus (numpy object, sel kosong = None lewat pd.isna) lalu ditulis
+# dengan write_row; format angka/tanggal dipasang per kolom dan dipakai semua sel tanpa format sendiri.
+def build_excel_report(tables, chunk_rows=10000):
+    import xlsxwriter
+
+    buffer = io.BytesIO()
+    # Teks ditulis apa adanya (tidak diubah jadi formula/URL), sama seperti write_string
+    workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False})
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#D9D9D9', 'border': 1})
+    decimal_format = workbook.add_format({'num_format': '#,##0.00'})
+    integer_format = workbook.add_format({'num_format': '#,##0'})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+
+    for sheet_name, table in tables.items():
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        worksheet.write_row(0, 0, [str(c) for c in table.columns], header_format)
+        converters = []
+        for j, column in enumerate(table.columns):
+            values = table.iloc[:, j]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                # Kolom tanggal murni (jam 00:00 semua) ditampilkan tanpa jam
+                tanggal_saja = (values.dropna() == values.dropna().dt.normalize()).all()
+                worksheet.set_column(j, j, 18, date_format if tanggal_saja else datetime_format)
+                converters.append(lambda v: v.dt.to_pydatetime())
+            elif pd.api.types.is_bool_dtype(values):
+                converters.append(lambda v: v.to_numpy(dtype=object))
+            elif pd.api.types.is_integer_dtype(values):
+                worksheet.set_column(j, j, 14, integer_format)
+                converters.append(lambda v: v.to_numpy(dtype=object))
+            elif pd.api.types.is_float_dtype(values):
+                worksheet.set_column(j, j, 16, decimal_format)
+                converters.append(lambda v: v.to_numpy(dtype=object))
+            else:
+                worksheet.set_column(j, j, 22)
+                converters.append(lambda v: v.astype(str).to_numpy(dtype=object))
+
+        for start in range(0, len(table), chunk_rows):
+            chunk = table.iloc[start:start + chunk_rows]
+            rows = np.empty(chunk.shape, dtype=object)
+            for j, convert in enumerate(converters):
+                rows[:, j] = convert(chunk.iloc[:, j])
+            # Sel kosong (NaN/NaT/None/pd.NA) ditulis None sehingga dilewati
+            rows[pd.isna(chunk).to_numpy()] = None
+            for i, row in enumerate(rows.tolist(), start=start + 1):
+                worksheet.write_row(i, 0, row)
+
+    workbook.close()
+    return buffer.getvalue()
+
+# Unduhan dashboard dibuat saat tombol diklik, dan Streamlit menyimpan callable-nya selama sesi hidup.
+# Fungsi yang didefinisikan di script dashboard ikut menahan seluruh namespace script (termasuk frame hasil
+# filter per sesi), jadi callable unduhan dirakit dari fungsi modul di bawah ini dengan functools.partial:
+# yang disimpan hanya pilihan filter, target dan tabel agregat; data disusun ulang saat tombol diklik.
+def load_uploaded_dataset(upload, filename, shift_starts, operator_aliases):
+    return prepare_dataset(read_workbook(io.BytesIO(upload.getvalue()), filename), shift_starts, operator_aliases)
+
+# Data hasil filter dari dataset lengkap (load_dataset mis. DatasetCache.get_or_load) + pilihan filter + target
+def rebuild_filtered(load_dataset, date_start, date_end, filters=None, targets=None):
+    df = filter_dataset(load_dataset(), date_start, date_end, filters)
+    return df if targets is None else assign_targets(df, *targets)
+
+def export_filtered(export, load_filtered, file_format):
+    return export(load_filtered(), file_format)
+
+# Tabel laporan Excel dashboard: tabel yang sudah tampil (Rakor, SPPH/Mitra) + Jam Dumping dan Top Operator
+# sesuai pilihan form terakhir, dan data mentah hasil filter bila diminta
+def build_dashboard_report(build_report, load_filtered, tables, jam_dumping_selection=None, operator_mitra=(), include_raw_data=False):
+    df = load_filtered()
+    tables = dict(tables)
+    if {'jam dumping', 'spph'}.issubset(df.columns):
+        # Tanpa pilihan form: semua mitra, dump truck dan lokasi pada seluruh rentang tanggal
+        selection = jam_dumping_selection or (
+            df['spph'].unique().tolist(), "Semua Dump Truck", "Semua Lokasi",
+            df['tanggal_operasional'].min(), df['tanggal_operasional'].max()
+        )
+        jam_dumping_sets, _ = compute_jam_dumping_sets(df, *selection)
+        tables['Jam Dumping Total'] = jam_dumping_sets["Total Semua Hari"]
+        tables['Jam Dumping Harian'] = jam_dumping_sets["Harian"].assign(day=lambda d: pd.to_datetime(d['day']))
+    if {'nama operator', 'spph'}.issubset(df.columns):
+        ritase_matrix, operator_labels, mitra_options, _, _ = compute_operator_ritase_matrix(df)
+        mitra_rows = [mitra_options.index(m) for m in operator_mitra if m in mitra_options] or list(range(len(mitra_options)))
+        operator_ritase_df, _, _, _ = rank_operators(ritase_matrix[mitra_rows].sum(axis=0), operator_labels)
+        tables['Top Operator'] = operator_ritase_df[['No', 'operator_mitra', 'total_ritase', 'Kategori']]
+    if include_raw_data:
+        tables['Data'] = df
+    return build_report(tables)
+
+# Memori proses (RSS) dalam MB dari /proc (server Linux); None jika tidak tersedia
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+# Satu catatan debug performa dashboard (waktu, baris, perubahan RSS, ukuran payload)
+def perf_entry(stage, start, rss_before, rows_in=None, rows_out=None, payload_kb=None, run=None):
+    rss_after = current_rss_mb()
+    return {
+        'run': run,
+        'waktu': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'stage': stage,
+        'wall_ms': round((time.perf_counter() - start) * 1000, 1),
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'mem_delta_mb': round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None,
+        'payload_kb': payload_kb
+    }
+
+# Unduhan dengan catatan performa; record = perf_history.append sesi (dijalankan Streamlit di thread lain)
+def timed_download(build, record, stage, run):
+    start, rss_before = time.perf_counter(), current_rss_mb()
+    data = build()
+    record(perf_entry(stage, start, rss_before, payload_kb=round(len(data) / 1024, 1), run=run))
+    return data
+
+# Agregat per entitas (exca, dump truck, loading point, operator) dengan kode integer, sekali per dataset per kolom
+def compute_entity_aggregates(df, entity_column, batas_jeda=60.0):
+    codes, entities = pd.factorize(df[entity_column])
+    valid = codes >= 0
+    n_entity = len(entities)
+    tonase = df['tonase'].to_numpy(dtype=float)
+    aggregates = {
+        'entities': np.asarray([str(e) for e in entities], dtype=object),
+        'ritase': np.bincount(codes[valid], minlength=n_entity).astype(float),
+        'tonase': np.bincount(codes[valid], weights=tonase[valid], minlength=n_entity)
+    }
+
+    # Tonase per (entitas, rute); ton-km = matriks ini dikali array jarak rute
+    if {'loading point', 'dumping point'}.issubset(df.columns):
+        route_codes, loading_points, dumping_points = compute_route_codes(df)
+        n_route = len(loading_points) * len(dumping_points)
+        ok = valid & (route_codes >= 0)
+        aggregates['tonase_route'] = np.bincount(
+            codes[ok] * n_route + route_codes[ok], weights=tonase[ok], minlength=n_entity * n_route
+        ).reshape(n_entity, n_route)
+
+    # Waktu siklus = rata-rata jeda antar ritase berurutan entitas yang sama (jeda > batas dianggap sesi baru)
+    if 'datetime_dumping' in df.columns:
+        ok = valid & df['datetime_dumping'].notna().to_numpy()
+        detik = df['datetime_dumping'].to_numpy(dtype='datetime64[s]')[ok].astype(np.int64)
+        entity_codes = codes[ok]
+        order = np.lexsort((detik, entity_codes))
+        entity_codes, detik = entity_codes[order], detik[order]
+        jeda = np.diff(detik) / 60
+        sambung = (entity_codes[1:] == entity_codes[:-1]) & (jeda <= batas_jeda)
+        siklus_sum = np.bincount(entity_codes[1:][sambung], weights=jeda[sambung], minlength=n_entity)
+        siklus_n = np.bincount(entity_codes[1:][sambung], minlength=n_entity)
+        aggregates['siklus_menit'] = np.divide(siklus_sum, siklus_n, out=np.zeros(n_entity), where=siklus_n > 0)
+    return aggregates
+
+# Semua periode (harian/mingguan/bulanan/total) dihitung dalam satu kali proses dan di-cache
+# per pilihan form, sehingga ganti periode atau grafik tidak menghitung ulang
+# Filter pilihan form Jam Dumping (mitra, dump truck, lokasi), dipakai juga oleh rollup match factor
+def filter_jam_dumping_selection(df, selected_mitra, selected_truck, selected_lokasi):
+    # 1. Filter by selected_mitra, SGJTotal = SGJ1 + SGJ2 + SGJ3 + SPARE
+    if selected_mitra:
+        mitra = [m for m in selected_mitra if m != "SGJTotal"]
+        if "SGJTotal" in selected_mitra:
+            mitra += ['SGJ1', 'SGJ2', 'SGJ3', 'SPARE']
+        df = df[df['spph'].isin(mitra)]
+
+    # 2. Filter by selected_truck
+    if selected_truck != "Semua Dump Truck":
+        df = df[df['dump truck'] == selected_truck]
+
+    # 3. Filter by selected_lokasi
+    if selected_lokasi != "Semua Lokasi":
+        df = df[df['lokasi'] == selected_lokasi]
+    return df
+
+def compute_jam_dumping_sets(df, selected_mitra, selected_truck, selected_lokasi, date_start, date_end):
+    df = filter_jam_dumping_selection(df, selected_mitra, selected_truck, selected_lokasi)
+
+    # Jam dumping sudah di-parse saat ingest; hitung yang gagal di-parse pada rentang tanggal
+    df = df.dropna(subset=['jam dumping'])
+    dalam_rentang = (df['date'] >= pd.to_datetime(date_start)) & (df['date'] <= pd.to_datetime(date_end))
+    gagal_parse = int((dalam_rentang & df['datetime_dumping'].isnull()).sum())
+
+    # 4. Filter by selected_date_range (hari operasional, shift malam tidak terpotong tengah malam)
+    df = df[(df['tanggal_operasional'] >= pd.to_datetime(date_start)) & (df['tanggal_operasional'] <= pd.to_datetime(date_end))]
+
+    # Grain terkecil (hari, jam) dihitung sekali dari data mentah
+    base = df.groupby(['tanggal_operasional', 'jam_operasional', 'hour'], as_index=False).agg(
+        total_tonase=('tonase', 'sum'),
+        total_ritase=('tonase', 'size')
+    ).rename(columns={'tanggal_operasional': 'day'})
+    base['hour'] = base['hour'].astype(int)
+    base['week'] = base['day'].dt.isocalendar().week.astype(int)
+    base['month'] = base['day'].dt.to_period('M').astype(str)
+
+    # Grouping sets: periode lain cukup di-rollup dari tabel (hari, jam) yang kecil.
+    # Urutan jam mengikuti jam operasional (mulai dari shift pertama)
+    sets = {
+        "Harian": base.assign(day=base['day'].dt.date)[['day', 'jam_operasional', 'hour', 'total_tonase', 'total_ritase']],
+        "Mingguan": base.groupby(['week', 'jam_operasional', 'hour'], as_index=False)[['total_tonase', 'total_ritase']].sum(),
+        "Bulanan": base.groupby(['month', 'jam_operasional', 'hour'], as_index=False)[['total_tonase', 'total_ritase']].sum(),
+        "Total Semua Hari": base.groupby(['jam_operasional', 'hour'], as_index=False)[['total_tonase', 'total_ritase']].sum()
+    }
+    sets = {period: jam_dumping_df.drop(columns='jam_operasional') for period, jam_dumping_df in sets.items()}
+
+    # Hitung jumlah hari total
+    total_days = (pd.to_datetime(date_end) - pd.to_datetime(date_start)).days + 1
+    for jam_dumping_df in sets.values():
+        jam_dumping_df["total_tonase"] = jam_dumping_df["total_tonase"].round(2)
+        jam_dumping_df["avg_ritase"] = (jam_dumping_df["total_ritase"] / total_days).round(2)
+    return sets, gagal_parse
+
+# Tabel peringkat operator (urut ritase turun) dengan kategori Top 10 tertinggi/terendah
+def rank_operators(total_ritase, operator_labels):
+    top_idx, bottom_idx = top_bottom_k(total_ritase, 10)
+    order = np.flatnonzero(total_ritase > 0)
+    order = order[np.argsort(-total_ritase[order], kind='stable')]
+    operator_ritase_df = pd.DataFrame({
+        'operator_mitra': operator_labels[order],
+        'total_ritase': total_ritase[order]
+    })
+    kategori = np.full(len(total_ritase), 'Di Luar Top 10', dtype=object)
+    kategori[top_idx] = 'Top 10 Tertinggi'
+    kategori[bottom_idx] = 'Top 10 Terendah'
+    operator_ritase_df['Kategori'] = kategori[order]
+    operator_ritase_df['No'] = operator_ritase_df.index + 1
+    return operator_ritase_df, top_idx, bottom_idx, order
+
+# Kepadatan dumping point: jumlah dumping dalam jendela waktu bergulir per dumping point
+def compute_dumping_congestion(df, window_menit):
+    arrivals = df[['dumping point', 'datetime_dumping', 'tanggal_operasional']].copy()
+    arrivals = arrivals.dropna(subset=['dumping point', 'datetime_dumping'])
+    arrivals = arrivals.sort_values(['dumping point', 'datetime_dumping'], kind='mergesort').reset_index(drop=True)
+
+    # Kunci gabungan (kode dumping point, detik) agar satu searchsorted melayani semua dumping point;
+    # jarak antar kode jauh lebih besar dari jendela sehingga jendela tidak pernah melewati batas grup
+    kode = arrivals['dumping point'].astype('category').cat.codes.to_numpy(dtype=np.int64)
+    detik = arrivals['datetime_dumping'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+    kunci = kode * 10**10 + detik
+    awal = np.searchsorted(kunci, kunci - int(window_menit * 60), side='right')
+    # Akhir jendela = posisi setelah kedatangan terakhir dengan detik yang sama, agar kedatangan serentak ikut terhitung
+    arrivals['jumlah_window'] = np.searchsorted(kunci, kunci, side='right') - awal
+    arrivals['day'] = arrivals['tanggal_operasional'].dt.date
+    return arrivals
+
+# Snapshot HTML statis: satu bundle Plotly JS, satu logo dan satu tema untuk semua grafik.
+# items = daftar ('judul', teks) / ('grafik', figure) / ('tabel', DataFrame) sesuai urutan tampil.
+def build_html_snapshot(title, logo_base64, items, subtitle="", include_plotlyjs=True):
+    import html
+    import plotly.graph_objects as go
+    import plotly.offline
+
+    body = []
+    for kind, item in items:
+        if kind == 'judul':
+            body.append(f"<h2>{html.escape(item)}</h2>")
+        elif kind == 'grafik':
+            # Logo per grafik dibuang (sudah ada satu di header) dan tema disamakan
+            fig = go.Figure(item)
+            fig.layout.images = []
+            fig.update_layout(
+                template="plotly_dark",
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(size=15, color="white")
+            )
+            body.append(fig.to_html(full_html=False, include_plotlyjs=False, config={'displaylogo': False}))
+        elif kind == 'tabel':
+            body.append(item.to_html(float_format=lambda x: f"{x:,.2f}", na_rep="", border=0, classes="tabel"))
+
+    if include_plotlyjs:
+        plotly_script = f"<script>{plotly.offline.get_plotlyjs()}</script>"
+    else:
+        plotly_script = f'<script src="https://cdn.plot.ly/plotly-{plotly.offline.get_plotlyjs_version()}.min.js"></script>'
+    return f"""<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(title)}</title>
+<style>
+body {{ background: #0e1117; color: #fafafa; font-family: sans-serif; margin: 24px; }}
+header {{ display: flex; align-items: center; margin-bottom: 24px; }}
+header img {{ width: 160px; margin-right: 20px; }}
+h2 {{ border-top: 1px solid red; padding-top: 16px; }}
+.tabel {{ border-collapse: collapse; margin: 12px 0; }}
+.tabel th, .tabel td {{ padding: 4px 10px; border-bottom: 1px solid #333; text-align: right; }}
+</style>
+{plotly_script}
+</head>
+<body>
+<header><img src="data:image/png;base64,{logo_base64}" alt="Logo"><div><h1>{html.escape(title)}</h1><p>{html.escape(subtitle)}</p></div></header>
+{"".join(body)}
+</body>
+</html>
+""".encode('utf-8')
+
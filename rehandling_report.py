@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.express as px
+import plotly.offline
+
+import rehandling_core as core
+
+# Laporan tanpa UI: baca workbook, hitung tabel/grafik dashboard dan simpan ke satu folder.
+# Setiap bagian dijalankan paralel di process pool; cocok dijadwalkan lewat cron, contoh:
+#   python rehandling_report.py data.xlsx --output laporan/$(date +%F) --start 2024-10-01 --end 2024-10-31
+
+def write_table(table, output_dir, name):
+    path = os.path.join(output_dir, f"{name}.csv")
+    table.to_csv(path, index=False)
+    return path
+
+def write_figure(fig, output_dir, name):
+    fig.update_layout(font=dict(size=15))
+    path = os.path.join(output_dir, f"{name}.html")
+    # plotly.min.js ditulis sekali di folder output oleh main(), setiap grafik cukup merujuknya
+    fig.write_html(path, include_plotlyjs='directory')
+    return path
+
+# Setiap bagian mengembalikan {nama sheet: tabel} untuk laporan Excel dan daftar berkas yang ditulis
+def section_rakor(df, options, output_dir):
+    rakor_df = core.build_rakor_table(df, core.days_in_current_month())
+    fig = px.bar(rakor_df[rakor_df['status'] != 'Total'], x="status", y=["target_rakor", "tonase"], barmode="group", template="plotly_dark")
+    return {'Rakor': rakor_df}, [write_table(rakor_df, output_dir, 'target_rakor'), write_figure(fig, output_dir, 'target_rakor')]
+
+def section_spph_mitra(df, options, output_dir):
+    spph_mitra_df = core.build_spph_mitra_table(df, core.days_in_current_month())
+    fig = px.bar(spph_mitra_df[spph_mitra_df['spph'] != 'Total'], x="spph", y=["target_spph_mitra", "tonase"], barmode="group", template="plotly_dark")
+    return {'SPPH Mitra': spph_mitra_df}, [write_table(spph_mitra_df, output_dir, 'target_spph_mitra'), write_figure(fig, output_dir, 'target_spph_mitra')]
+
+def section_jam_dumping(df, options, output_dir):
+    jam_dumping_sets, _ = core.compute_jam_dumping_sets(
+        df, df['spph'].unique().tolist(), "Semua Dump Truck", "Semua Lokasi",
+        df['tanggal_operasional'].min(), df['tanggal_operasional'].max()
+    )
+    files = [
+        write_table(jam_dumping_df, output_dir, f"jam_dumping_{period.lower().replace(' ', '_')}")
+        for period, jam_dumping_df in jam_dumping_sets.items()
+    ]
+    total_df = jam_dumping_sets["Total Semua Hari"]
+    fig = px.bar(total_df, x=total_df['hour'].astype(str), y='total_tonase', hover_data=['total_ritase', 'avg_ritase'],
+                 labels={'x': 'Jam', 'total_tonase': 'Total Tonase'}, title="Jam Dumping Total Semua Hari", template="plotly_dark")
+    files.append(write_figure(fig, output_dir, 'jam_dumping_total'))
+    return {'Jam Dumping Total': total_df, 'Jam Dumping Harian': jam_dumping_sets["Harian"].assign(day=lambda d: pd.to_datetime(d['day']))}, files
+
+def section_top_operator(df, options, output_dir):
+    ritase_matrix, operator_labels, _, _, _ = core.compute_operator_ritase_matrix(df)
+    operator_ritase_df, top_idx, _, _ = core.rank_operators(ritase_matrix.sum(axis=0), operator_labels)
+    operator_ritase_df = operator_ritase_df[['No', 'operator_mitra', 'total_ritase', 'Kategori']]
+    fig = px.bar(operator_ritase_df.head(len(top_idx)), x='operator_mitra', y='total_ritase',
+                 title="Top 10 Operator Dump Truck dengan Ritase Tertinggi", template="plotly_dark")
+    return {'Top Operator': operator_ritase_df}, [write_table(operator_ritase_df, output_dir, 'top_operator'), write_figure(fig, output_dir, 'top_operator')]
+
+def section_exca_loading(df, options, output_dir):
+    _, summary, _ = core.compute_exca_loading(df, options['batas_jeda'])
+    return {'Excavator Loading': summary}, [write_table(summary, output_dir, 'excavator_loading')]
+
+SECTIONS = {
+    'rakor': (section_rakor, {'status', 'spph'}),
+    'spph_mitra': (section_spph_mitra, {'status', 'spph'}),
+    'jam_dumping': (section_jam_dumping, {'jam dumping', 'spph'}),
+    'top_operator': (section_top_operator, {'nama operator', 'spph'}),
+    'exca_loading': (section_exca_loading, {'exca', 'loading point', 'dump truck', 'jam dumping'})
+}
+
+def load_dataset(args):
+    with open(args.workbook, 'rb') as f:
+        df = core.read_workbook(f, os.path.basename(args.workbook))
+
+    def config(name):
+        return core.load_json(os.path.join(args.config_dir, name))
+
+    shift_starts = core.parse_shift_starts(", ".join(config('shift_calendar.json').get('shift_starts', ["06:00", "18:00"])))
+    df = core.prepare_dataset(df, shift_starts, config('operator_aliases.json'))
+
+    min_date, max_date = core.date_bounds(df)
+    date_start = pd.to_datetime(args.start) if args.start else min_date
+    date_end = pd.to_datetime(args.end) if args.end else max_date
+    df = core.filter_dataset(df, date_start, date_end, {
+        'shift': args.shift, 'dump truck': args.dump_truck, 'exca': args.exca,
+        'loading point': args.loading_point, 'dumping point': args.dumping_point
+    })
+
+    return core.assign_saved_targets(df, config('rakor_targets.json'), config('spph_mitra_targets.json'), date_start, date_end)
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan rehandling batubara tanpa dashboard")
+    parser.add_argument('workbook', help="File ritase (.xlsx atau .csv)")
+    parser.add_argument('--output', default='laporan', help="Folder output tabel (CSV), grafik (HTML) dan laporan Excel")
+    parser.add_argument('--config-dir', default='.', help="Folder json target, kalender shift dan alias operator")
+    parser.add_argument('--start', help="Tanggal awal (YYYY-MM-DD), default tanggal paling awal di data")
+    parser.add_argument('--end', help="Tanggal akhir (YYYY-MM-DD), default tanggal paling akhir di data")
+    parser.add_argument('--shift', nargs='*')
+    parser.add_argument('--dump-truck', nargs='*')
+    parser.add_argument('--exca', nargs='*')
+    parser.add_argument('--loading-point', nargs='*')
+    parser.add_argument('--dumping-point', nargs='*')
+    parser.add_argument('--sections', nargs='*', choices=list(SECTIONS), default=list(SECTIONS))
+    parser.add_argument('--batas-jeda', type=float, default=60.0, help="Batas jeda antar ritase dalam satu sesi (menit)")
+    parser.add_argument('--workers', type=int, default=None, help="Jumlah proses paralel, default jumlah CPU")
+    parser.add_argument('--raw', action='store_true', help="Sertakan data mentah hasil filter di laporan Excel")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = load_dataset(args)
+    os.makedirs(args.output, exist_ok=True)
+    bundle_path = os.path.join(args.output, 'plotly.min.js')
+    if not os.path.exists(bundle_path):
+        with open(bundle_path, 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+    print(f"Data: {len(df)} baris ({time.perf_counter() - start:.2f} detik)")
+
+    options = {'batas_jeda': args.batas_jeda}
+    sections = [name for name in args.sections if SECTIONS[name][1].issubset(df.columns)]
+    for name in set(args.sections) - set(sections):
+        print(f"Lewati {name}: kolom {sorted(SECTIONS[name][1] - set(df.columns))} tidak ada")
+
+    tables = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {name: pool.submit(SECTIONS[name][0], df, options, args.output) for name in sections}
+        for name, future in futures.items():
+            section_tables, files = future.result()
+            tables.update(section_tables)
+            for path in files:
+                print(f"{name}: {path}")
+
+    if args.raw:
+        tables['Data'] = df
+    report_path = os.path.join(args.output, 'laporan_rehandling_batubara.xlsx')
+    with open(report_path, 'wb') as f:
+        f.write(core.build_excel_report(tables))
+    print(f"Laporan Excel: {report_path}")
+    print(f"Selesai dalam {time.perf_counter() - start:.2f} detik")
+
+if __name__ == '__main__':
+    main()